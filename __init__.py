@@ -1,12 +1,22 @@
 
 import pandas as pd
-import os, time
+import numpy  as np
+import os, io, sys, time, shutil, pickle, hashlib, csv
+import json as jsonlib
+import collections, concurrent.futures, itertools, queue, threading, heapq
+import socket, multiprocessing.managers
+import contextlib, mmap, math, gzip, bz2, lzma, re, copy
+try:    import resource     # unix
+except ImportError: resource = None
 
 # don't relative import when unittesting or error
 if __name__ != '__main__': from . import (_jsonmgr as json, 
-                                          _pdmgr as pdmgr,)
+                                          _pdmgr as pdmgr,
+                                          _sketchmgr as sketchmgr,)
 # modules from this package used in unittesting
-else: from datamgr import _pdmgr as pdmgr
+else: from datamgr import (_jsonmgr as json, 
+                          _pdmgr as pdmgr,
+                          _sketchmgr as sketchmgr,)
 
 
 #################################################################
@@ -34,6 +44,710 @@ class Timer:
         timetaken.append('%s %s' % (round(secs, 2), SECS[1]))
         return ', '.join(timetaken)
 
+def roundrobin(items):
+    """
+    Yields rounds (lists) of (item1, item2) pairs, every unique pair 
+    of items once, such that no item appears twice in a round. Thus, 
+    rounds pairs are independent (circle method tournament).
+    """
+    items = list(items)
+    if len(items) % 2: items.append(None)   # bye
+    nitems = len(items)
+    for roundnum in range(nitems - 1):
+        pairs = [(items[i], items[nitems - 1 - i]) 
+                 for i in range(nitems // 2)]
+        yield [pair for pair in pairs if None not in pair]
+        items.insert(1, items.pop())        # rotate all but first
+
+def naturalkey(path):
+    "Returns path sort key, digits as numbers (ie. 'a-2' before 'a-10')"
+    return [int(part) if num % 2 else part 
+            for num, part in enumerate(re.split(r'(\d+)', path))]
+
+def scandirs(dirname):
+    "Yields dirname and its subdirectories (recursively) by os.scandir"
+    yield dirname
+    with os.scandir(dirname) as entries:
+        subdirs = [entry.path for entry in entries 
+                   if entry.is_dir(follow_symlinks=False)]
+    for subdir in subdirs: yield from scandirs(subdir)
+
+def removefiles(dirname):
+    "Removes dirname files (not subdirectories)"
+    with os.scandir(dirname) as entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False): os.unlink(entry.path)
+
+def peakrss():
+    "Returns the process peak resident memory in MB (None if unknown)"
+    if not resource: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2 ** 20) if sys.platform == 'darwin' else peak / (2 ** 10)
+
+class Metrics:
+    """
+    Records metrics per task (chunk or pair), a record (dict) per task:
+        + kind:     task method (ie. 'onchunkpath', 'onparallel')
+        + task:     task chunks paths (tab separated)
+        + seconds:  task time, split in load, compute and dump seconds
+        + rowsin, rowsout, bytesin, bytesout: loaded and dumped counts
+        + rowspersec, bytespersec: (in + out) throughput over seconds
+        + peakrss:  process peak resident memory (MB) at task end
+        + queues (ie. 'prefetch') depths at task start
+    Loading and dumping are measured by measure and count (ie. in 
+    FileSystemMgr.loadchunk and writechunk) for open tasks records of 
+    the calling thread. hooks (callables) are called with every 
+    record. If keep (opt-in, a record per chunk and pair adds up for 
+    millions of pairs), records are kept in self.records too, export 
+    them by tojson or tocsv.
+    """
+    fields = ['kind', 'task', 'seconds', 'load', 'compute', 'dump', 
+              'rowsin', 'rowsout', 'bytesin', 'bytesout', 
+              'rowspersec', 'bytespersec', 'peakrss']
+    def __init__(self, keep=False):
+        self.keep     = keep
+        self.records  = []
+        self.hooks    = []
+        self.queues   = {}  # name: queue, depths recorded
+        self.expected = {}  # task: fields measured before the task
+        self.stacks   = {}  # thread: open records
+
+    def openrecords(self):
+        return self.stacks.setdefault(threading.get_ident(), [])
+
+    @contextlib.contextmanager
+    def task(self, kind, args):
+        "records the block as a task of kind on args (paths are kept)"
+        record = dict.fromkeys(self.fields, 0)
+        record['kind'] = kind
+        record['task'] = '\t'.join(arg for arg in args if isinstance(arg, str))
+        for name, depths in self.queues.items(): record[name] = depths.qsize()
+        records = self.openrecords()
+        records.append(record)
+        started = time.perf_counter()
+        try: yield record
+        finally:
+            records.pop()
+            record['seconds'] = time.perf_counter() - started
+            record['compute'] = max(record['seconds'] - record['load'] 
+                                                      - record['dump'], 0)
+            record['peakrss'] = peakrss()
+            self.add(record)
+
+    def expect(self, task, **fields):
+        "adds fields (ie. load seconds) measured before task to its record"
+        self.expected[task] = fields
+
+    def add(self, record):
+        "adds a finished (ie. workers) record, then calls hooks"
+        for field, value in self.expected.pop(record['task'], {}).items():
+            record[field] += value
+            if field == 'load': record['seconds'] += value
+        seconds = max(record['seconds'], 1e-9)
+        record['rowspersec']  = (record['rowsin']  + record['rowsout']) / seconds
+        record['bytespersec'] = (record['bytesin'] + record['bytesout']) / seconds
+        if self.keep: self.records.append(record)
+        for hook in self.hooks: hook(record)
+
+    @contextlib.contextmanager
+    def measure(self, field):
+        "adds the block seconds to field of open records"
+        started = time.perf_counter()
+        try: yield
+        finally:
+            seconds = time.perf_counter() - started
+            for record in self.openrecords(): record[field] += seconds
+
+    def count(self, **fields):
+        "adds counts (ie. rowsin=n) to fields of open records"
+        for record in self.openrecords():
+            for field, value in fields.items(): record[field] += value
+
+    def tojson(self, opath):
+        with open(opath, 'w') as file: jsonlib.dump(self.records, file)
+
+    def tocsv(self, opath):
+        fields = list(self.fields)
+        for record in self.records:
+            fields.extend(field for field in record if field not in fields)
+        with open(opath, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fields)
+            writer.writeheader()
+            writer.writerows(self.records)
+
+def filehash(path, buffersize=2 ** 20):
+    "Returns path file content hash (hex blake2b)"
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for buffer in iter(lambda: file.read(buffersize), b''): 
+            digest.update(buffer)
+    return digest.hexdigest()
+
+class HashedFile(io.FileIO):
+    """
+    Written binary file hashing its bytes as written (as filehash), 
+    hexdigest is None once seeked (bytes rewritten, see filehash).
+    """
+    def __init__(self, path, mode='wb'):
+        super().__init__(path, mode)
+        self.digest = hashlib.blake2b(digest_size=16)
+
+    def write(self, buffer):
+        written = super().write(buffer)
+        if written and self.digest: 
+            self.digest.update(memoryview(buffer).cast('B')[:written])
+        return written
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self.digest = None
+        return super().seek(offset, whence)
+
+    def hexdigest(self): return self.digest and self.digest.hexdigest()
+
+def copychunk(chunkpath, ofile, offset=None, buffersize=2 ** 20):
+    """
+    Copies chunkpath file bytes to unbuffered ofile (opened with 
+    buffering=0) in kernel if possible (os.copy_file_range or 
+    os.sendfile), else through a fixed buffer. Writes at ofile 
+    position, or at offset (os.pwrite) if passed. Returns copied bytes.
+    """
+    size = os.path.getsize(chunkpath)
+    ofd  = ofile.fileno()
+    with open(chunkpath, 'rb', buffering=0) as chunk:
+        ifd, copied = chunk.fileno(), 0
+        # kernel copies, filesystems may refuse (ie. EXDEV, EINVAL, 
+        # EOPNOTSUPP), then the next way copies the rest
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while copied < size:
+                    dst    = None if offset is None else offset + copied
+                    ncopy  = os.copy_file_range(ifd, ofd, size - copied, 
+                                                copied, dst)
+                    if not ncopy: break
+                    copied += ncopy
+            except OSError: pass
+        if offset is None and hasattr(os, 'sendfile'):
+            try:
+                while copied < size:
+                    ncopy  = os.sendfile(ofd, ifd, copied, size - copied)
+                    if not ncopy: break
+                    copied += ncopy
+            except OSError: pass
+        # fixed buffer fallback, unbuffered writes may be short
+        buffer = memoryview(bytearray(min(buffersize, max(size - copied, 1))))
+        chunk.seek(copied)
+        while copied < size:
+            nread = chunk.readinto(buffer)
+            if not nread: break
+            written = 0
+            while written < nread:
+                if offset is None: 
+                    written += ofile.write(buffer[written:nread])
+                else: 
+                    written += os.pwrite(ofd, buffer[written:nread], 
+                                         offset + copied + written)
+            copied += nread
+    return copied
+
+def prefetched(iterable, depth, queues=None):
+    """
+    Yields iterable items read ahead by a thread into a queue of depth 
+    items at most (thus, reading overlaps consuming). Iterable errors 
+    raise in the consumer. Close (or exhaust) it to stop the thread. 
+    The queue is kept as queues['prefetch'] if queues (ie. Metrics).
+    """
+    items, stop, done = queue.Queue(depth), threading.Event(), object()
+    if queues is not None: queues['prefetch'] = items
+    def put(item):
+        while not stop.is_set():
+            try: return items.put(item, timeout=0.1)
+            except queue.Full: pass
+    def read():
+        try:
+            for item in iterable:
+                put((item, None))
+                if stop.is_set(): return
+            put((done, None))
+        except BaseException as error: put((done, error))
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error: raise error
+            if item is done: return
+            yield item
+    finally: 
+        stop.set()
+        reader.join()
+
+class ChunkWriter:
+    """
+    Dumps chunks by dump(data, chunkpath) callable in a thread behind a 
+    queue of depth chunks at most, thus dumping overlaps computing. 
+    Dumping errors raise in put or close.
+    """
+    def __init__(self, dump, depth):
+        self.dump   = dump
+        self.chunks = queue.Queue(depth)
+        self.error  = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    def run(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None: return
+            if self.error: continue     # drain after errors
+            try: self.dump(*chunk)
+            except BaseException as error: self.error = error
+    def put(self, data, chunkpath):
+        if self.error: raise self.error
+        self.chunks.put((data, chunkpath))
+    def close(self):
+        "waits for queued chunks dumps"
+        self.chunks.put(None)
+        self.thread.join()
+        if self.error: raise self.error
+
+class Journal:
+    """
+    Checkpoint journal file of completed tasks (paths tuples), a line 
+    per task flushed when recorded. If resume, recorded tasks are 
+    loaded and appended to (a torn last line is ignored), else the 
+    journal restarts. Only loaded tasks are kept in memory, tasks 
+    recorded later aren't looked up again by the same operation.
+    """
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.done = set()
+        if resume and os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    if line.endswith('\n'): 
+                        self.done.add(tuple(line[:-1].split('\t')))
+        self.file = open(path, 'a' if resume else 'w')
+    def __contains__(self, task): return task in self.done
+    def record(self, task):
+        self.file.write('\t'.join(task) + '\n')
+        self.file.flush()
+    def close(self, remove=False):
+        self.file.close()
+        if remove: os.remove(self.path)
+
+class ChunkCache:
+    """
+    LRU cache of loaded chunks data keyed by path and mtime, up to 
+    budget MB of data (memory_usage deep, unbounded if None). Data put 
+    (ie. by dumpchunk) are dirty and written back by dump(data, path) 
+    callable lazily: when evicted, released or flushed. A clean chunk 
+    changed on disk (mtime) is a miss.
+    """
+    def __init__(self, dump, budget=None):
+        self.dump     = dump
+        self.budget   = budget and budget * (10 ** 6)
+        self.entries  = collections.OrderedDict() # path: entry
+        self.nbytes   = 0
+        self.versions = itertools.count()
+    def __contains__(self, path): return path in self.entries
+    def key(self, path):
+        "Returns path data version key, cached or on disk"
+        entry = self.entries.get(path)
+        if entry: return path, 'cached', entry['version']
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+    def get(self, path):
+        "Returns path data if cached and unchanged, else None"
+        entry = self.entries.get(path)
+        if not entry: return None
+        if not entry['dirty']:
+            try: mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError: mtime = None
+            if mtime != entry['mtime']: 
+                self.discard(path)
+                return None
+        self.entries.move_to_end(path)
+        return entry['data']
+    def add(self, path, data, dirty=False):
+        "Caches path data (dirty if not on disk yet), evicts LRU data"
+        self.discard(path)
+        nbytes = (int(data.memory_usage(deep=True).sum()) 
+                  if hasattr(data, 'memory_usage') else sys.getsizeof(data))
+        self.entries[path] = {'data':    data, 
+                              'mtime':   None if dirty else 
+                                         os.stat(path).st_mtime_ns,
+                              'nbytes':  nbytes, 
+                              'dirty':   dirty, 
+                              'version': next(self.versions)}
+        self.nbytes += nbytes
+        while (self.budget and self.nbytes > self.budget and 
+               len(self.entries) > 1):
+            self.release(next(iter(self.entries)))
+    def put(self, path, data): self.add(path, data, dirty=True)
+    def writeback(self, path):
+        entry = self.entries[path]
+        if not entry['dirty']: return
+        self.dump(entry['data'], path)
+        entry['dirty'], entry['mtime'] = False, os.stat(path).st_mtime_ns
+    def discard(self, path):
+        "forgets path data, dirty data are lost"
+        entry = self.entries.pop(path, None)
+        if entry: self.nbytes -= entry['nbytes']
+    def release(self, path):
+        "writes back path data if dirty and forgets it"
+        if path not in self.entries: return
+        self.writeback(path)
+        self.discard(path)
+    def flush(self):
+        "writes back dirty data, kept cached"
+        for path in list(self.entries): self.writeback(path)
+    def clear(self):
+        "writes back dirty data and forgets all"
+        for path in list(self.entries): self.release(path)
+
+# worker processes state, see FileSystemMgr.runchunks
+_worker = None
+def _initworker(instance):
+    "remembers the (forked) operating instance in a worker process"
+    global _worker
+    _worker = instance
+    _worker.writer  = None  # threads aren't forked, dump synchronously
+    _worker.journal = None  # caller records completed tasks
+    _worker.metrics = Metrics(keep=True) # caller adds records, calls hooks
+    _worker.recorded = []   # caller adds dumped chunks manifest entries
+def _callworker(method, *args):
+    """
+    Returns (method return value, metrics records, manifest entries) 
+    of a task, see FileSystemMgr.addentry
+    """
+    result = _worker.runtask(method, args)
+    records, _worker.metrics.records = _worker.metrics.records, []
+    entries, _worker.recorded = _worker.recorded, []
+    return result, records, entries
+
+def processname():
+    "Returns host and pid name of this process, unique across hosts"
+    return '%s-%s' % (socket.gethostname(), os.getpid())
+
+class TaskBoard:
+    """
+    Tasks board of a Cluster, served to workers (see clusterworker) 
+    by the cluster manager process. Workers pull tasks (leased to 
+    them) and report outcomes, tasks of workers silent for timeout 
+    seconds (ie. dead) are requeued, retries times at most, then 
+    failed. A task is pulled by a worker of its hosts, unless they
+    all registered and none is alive or it waited localitywait 
+    seconds (stolen).
+    """
+    def __init__(self, timeout=10, retries=2, localitywait=1):
+        self.timeout      = timeout
+        self.retries      = retries
+        self.localitywait = localitywait
+        self.condition    = threading.Condition()
+        self.operations   = {}  # opid: pickled instance
+        self.pending      = collections.OrderedDict() # taskid: task
+        self.leased       = {}  # taskid: task
+        self.outcomes     = {}  # taskid: (ok, result, records, entries, 
+                                #          worker)
+        self.workers      = {}  # worker: (host, last heartbeat)
+        self.hosts        = set() # hosts of workers ever registered
+        self.taskids      = itertools.count()
+    def publish(self, opid, instance):
+        with self.condition: self.operations[opid] = instance
+    def operation(self, opid): return self.operations[opid]
+    def withdraw(self, opid):
+        "forgets opid operation and its tasks"
+        with self.condition:
+            self.operations.pop(opid, None)
+            for tasks in self.pending, self.leased:
+                for taskid in [taskid for taskid, task in tasks.items() 
+                               if task['opid'] == opid]: del tasks[taskid]
+    def submit(self, opid, method, args, hosts=()):
+        "Returns taskid of method on args of opid operation"
+        with self.condition:
+            taskid = next(self.taskids)
+            self.pending[taskid] = {'opid':   opid, 'method': method, 
+                                    'args':   args, 'hosts':  set(hosts), 
+                                    'runs':   0,    'worker': None, 
+                                    'queued': time.monotonic()}
+            self.condition.notify_all()
+            return taskid
+    def heartbeat(self, worker, host):
+        with self.condition: 
+            self.workers[worker] = host, time.monotonic()
+            self.hosts.add(host)
+    def alive(self):
+        "Returns hosts of live workers, requeues tasks of dead ones"
+        with self.condition:
+            now  = time.monotonic()
+            dead = {worker for worker, (host, beat) in self.workers.items() 
+                    if now - beat > self.timeout}
+            for taskid, task in list(self.leased.items()):
+                if task['worker'] not in dead: continue
+                del self.leased[taskid]
+                if task['runs'] > self.retries:
+                    error = RuntimeError('task %r lost with %s workers' % (
+                                         task['args'], task['runs']))
+                    self.outcomes[taskid] = False, error, [], task['worker']
+                else: 
+                    task['queued'] = now
+                    self.pending[taskid] = task
+                    self.pending.move_to_end(taskid, last=False) # retry first
+            for worker in dead: del self.workers[worker]
+            if dead: self.condition.notify_all()
+            return {host for host, beat in self.workers.values()}
+    def pull(self, worker, host, wait=1):
+        "Returns (taskid, opid, method, args) leased to worker, or None"
+        with self.condition:
+            self.workers[worker] = host, time.monotonic()
+            self.hosts.add(host)
+            deadline = time.monotonic() + wait
+            while True:
+                hosts = self.alive()
+                now   = time.monotonic()
+                for taskid, task in self.pending.items():
+                    # hosts not registered yet are late, not absent
+                    absent = (task['hosts'] <= self.hosts and 
+                              not task['hosts'] & hosts)
+                    if (host in task['hosts'] or absent or 
+                        now - task['queued'] > self.localitywait): break
+                else: taskid = None
+                if taskid is not None: break
+                if now >= deadline: return None
+                self.condition.wait(min(deadline - now, 0.1))
+            task = self.pending.pop(taskid)
+            task['runs']  += 1
+            task['worker'] = worker
+            self.leased[taskid] = task
+            return taskid, task['opid'], task['method'], task['args']
+    def report(self, worker, taskid, ok, result, records, entries):
+        "records taskid outcome, unless leased to another worker"
+        with self.condition:
+            host = self.workers.get(worker, (None, 0))[0]
+            self.workers[worker] = host, time.monotonic()
+            task = self.leased.get(taskid)
+            if not task or task['worker'] != worker: return
+            del self.leased[taskid]
+            self.outcomes[taskid] = ok, result, records, entries, worker
+            self.condition.notify_all()
+    def outcome(self, taskid, wait=1):
+        "Returns taskid (ok, result, records, entries, worker), or None"
+        with self.condition:
+            deadline = time.monotonic() + wait
+            while taskid not in self.outcomes:
+                self.alive()
+                now = time.monotonic()
+                if now >= deadline: return None
+                self.condition.wait(min(deadline - now, 0.1))
+            return self.outcomes.pop(taskid)
+
+# the cluster manager process board, made by the first call
+_board = None
+def _taskboard(*args):
+    global _board
+    if _board is None: _board = TaskBoard(*args)
+    return _board
+
+class ClusterManager(multiprocessing.managers.BaseManager): pass
+ClusterManager.register('board', callable=_taskboard)
+
+class Cluster:
+    """
+    Coordinator of chunks and pairs tasks run by workers processes on 
+    other hosts (see clusterworker), passed as operate workers (ie. 
+    chunks.operate(chunksdir, workers=cluster)). A TaskBoard is served 
+    at address by a manager process, operate publishes the pickled 
+    operation instance (its class importable by workers, journal, 
+    writer, cache, metrics and results aren't sent) and its tasks, 
+    inflight tasks ahead of results at most. Tasks return values, 
+    metrics records (with worker names) and dumped chunks manifest 
+    entries are collected in tasks order, a task error is raised in 
+    operate.
+        - constructor args:
+            + address: (host, port) served to workers, port 0 picks one
+                       (local host by default, pass ('', port) to serve 
+                       other hosts)
+            + authkey: workers connections key (bytes), random by default 
+                       (see authkey attribute)
+            + timeout: seconds without heartbeats of a dead worker, or 
+                       without live workers (operate raises)
+            + retries: reruns of tasks of dead workers
+            + inflight: tasks published ahead of results
+            + localitywait: seconds a task waits for a worker of its 
+                            hosts (see FileSystemMgr.chunkhosts)
+    Chunks paths must be the same on every host (ie. shared or 
+    replicated directories). Close the cluster (or use with). Workers 
+    unpickle the posted operations, thus anyone knowing authkey can 
+    run code on them: keep it secret and the address firewalled.
+    """
+    def __init__(self, address=('127.0.0.1', 0), authkey=None, *, timeout=10, 
+                       retries=2, inflight=64, localitywait=1):
+        self.inflight = inflight
+        self.timeout  = timeout
+        self.authkey  = authkey or os.urandom(32)
+        self.manager  = ClusterManager(address, self.authkey)
+        self.manager.start()
+        self.address  = self.manager.address
+        self.board    = self.manager.board(timeout, retries, localitywait)
+        self.opids    = itertools.count()
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): self.close()
+    def close(self): self.manager.shutdown()
+
+    def run(self, instance, method, tasks):
+        """
+        Yields (args, result, records, entries) of instance method tasks 
+        (args tuples) run by workers, in tasks order. Errors are raised.
+        """
+        opid  = '%s-%s' % (processname(), next(self.opids))
+        state = copy.copy(instance)
+        state.journal = state.writer = state.cache = state.metrics = None
+        state.results = []
+        self.board.publish(opid, pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+        pending = collections.deque()
+        def collect():
+            args, taskid = pending.popleft()
+            outcome, idle = None, time.monotonic()
+            while outcome is None: 
+                outcome = self.board.outcome(taskid)
+                # no live workers for timeout seconds, don't wait forever
+                if self.board.alive(): idle = time.monotonic()
+                elif outcome is None and time.monotonic() - idle > self.timeout:
+                    raise RuntimeError('no live workers of cluster %s:%s '
+                                       'for %s seconds' % (*self.address, 
+                                                           self.timeout))
+            ok, result, records, entries, worker = outcome
+            if not ok: raise result
+            for record in records: record['worker'] = worker
+            return args, result, records, entries
+        try:
+            for args in tasks:
+                pending.append((args, self.board.submit(opid, method, args, 
+                                                        instance.taskhosts(args))))
+                if len(pending) >= self.inflight: yield collect()
+            while pending: yield collect()
+        finally: self.board.withdraw(opid)
+
+def clusterworker(address, authkey, host=None, heartbeat=1):
+    """
+    Runs a Cluster worker in this process until the cluster closes: 
+    pulls tasks of the cluster at address, runs them on the published 
+    operations instances (see _initworker) and reports return values 
+    (or errors) and metrics records. authkey is the cluster authkey 
+    (see Cluster). host (this host name by default) is matched by 
+    tasks hosts, heartbeat is the heartbeats period.
+        - usage (per host and core): 
+            + python -c "import datamgr; datamgr.clusterworker(
+                         ('coordinator', 50000), open('key', 'rb').read())"
+    """
+    host    = host or socket.gethostname()
+    worker  = processname()
+    manager = ClusterManager(address, authkey)
+    manager.connect()
+    board   = manager.board()
+    stopped = threading.Event()
+    def beat():
+        while not stopped.wait(heartbeat):
+            try: board.heartbeat(worker, host)
+            except (OSError, EOFError): return
+    threading.Thread(target=beat, daemon=True).start()
+    instances = {}
+    try:
+        while True:
+            try: task = board.pull(worker, host)
+            except (OSError, EOFError): return     # cluster closed
+            if task is None: continue
+            taskid, opid, method, args = task
+            if opid not in instances:
+                instances.clear()
+                try: instances[opid] = pickle.loads(board.operation(opid))
+                except KeyError: continue   # withdrawn
+            _initworker(instances[opid])
+            try: 
+                result, records, entries = _callworker(method, *args)
+                ok = True
+            except Exception as error:
+                ok, result, records, entries = False, error, [], []
+                try: pickle.dumps(error)
+                except Exception: result = RuntimeError(repr(error))
+            try: board.report(worker, taskid, ok, result, records, entries)
+            except (OSError, EOFError): return
+    finally: stopped.set()
+
+
+#################################################################
+# chunks codecs 
+#################################################################
+class ChunkCodec:
+    """
+    Chunks dumping and loading interface on binary file objects. 
+    Binary codecs chunks are converted to text (see joinformat of 
+    FileSystemMgr) when joined, text codecs chunks are joined as is. 
+    loadcolumns loads chunks columns in columns only (see 
+    _pdmgr.project), columnar codecs don't read the others.
+    """
+    name   = None
+    binary = True
+    def dump(self, data, file): raise NotImplementedError
+    def load(self, file):       raise NotImplementedError
+    def loadcolumns(self, file, columns): 
+        return pdmgr.project(self.load(file), columns)
+
+class PickleCodec(ChunkCodec):
+    name = 'pickle'
+    def dump(self, data, file): pickle.dump(data, file, pickle.HIGHEST_PROTOCOL)
+    def load(self, file):       return pickle.load(file)
+
+class FeatherCodec(ChunkCodec):
+    "needs pyarrow and string columns labels, index is not kept"
+    name = 'feather'
+    def dump(self, data, file): data.reset_index(drop=True).to_feather(file)
+    def load(self, file):       return pd.read_feather(file)
+    def loadcolumns(self, file, columns):
+        import pyarrow.ipc
+        names = pyarrow.ipc.open_file(file).schema.names
+        file.seek(0)
+        return pd.read_feather(file, columns=[name for name in names 
+                                              if name in columns])
+
+class ParquetCodec(ChunkCodec):
+    "needs pyarrow (or fastparquet) and string columns labels"
+    name = 'parquet'
+    def dump(self, data, file): data.to_parquet(file)
+    def load(self, file):       return pd.read_parquet(file)
+    def loadcolumns(self, file, columns):
+        import pyarrow.parquet
+        names = pyarrow.parquet.read_schema(file).names
+        file.seek(0)
+        return pd.read_parquet(file, columns=[name for name in names 
+                                              if name in columns])
+
+class JsonCodec(ChunkCodec):
+    "json lines records, thus chunks join as is"
+    name   = 'json'
+    binary = False
+    def dump(self, data, file): 
+        file.write(data.to_json(orient='records', lines=True).encode())
+    def load(self, file):       return pd.read_json(file, lines=True)
+
+# codecs by name, register custom codecs here
+codecs = {codec.name: codec for codec in (PickleCodec, FeatherCodec, 
+                                          ParquetCodec, JsonCodec)}
+
+# chunks compressions file openers (path, mode) by name, stdlib and 
+# faster ones if installed, register custom compressions here
+compressions = {'gzip': lambda path, mode: gzip.open(path, mode, 
+                                                     compresslevel=6),
+                'bz2':  bz2.open,
+                'lzma': lzma.open,}
+try:
+    import zstandard
+    compressions['zstd'] = zstandard.open
+except ImportError: pass
+try:
+    import lz4.frame
+    compressions['lz4'] = lz4.frame.open
+except ImportError: pass
+
 
 #################################################################
 # System interfaces
@@ -44,29 +758,345 @@ class FileSystemMgr:
     logic (ie. self.StopOperation, self.init) used in higher 
     system classes implemented in this package. It's recommended 
     not to customize directly for data specific operations.
+
+    loadchunk and dumpchunk load and dump chunks with the codec 
+    recorded in the chunk directory codecfile (see BigData.operate), 
+    else with codec (name in codecs), else customize them. Binary 
+    codecs chunks are joined as text by joinformat pandas (method, 
+    kwargs).
+
+    Chunks directories manifestfile (JSON) records chunks names 
+    entries: bytes, mtime (ns), content hash and, if dumped by 
+    dumpchunk (in workers too), rows and columns statistics (see _pdmgr.stats). An 
+    entry is up to date (see chunkentry) if its file bytes and mtime 
+    are unchanged.
+
+    Every task (chunk or pair) is recorded in self.metrics (Metrics), 
+    add hooks to self.metrics.hooks, records are kept if keepmetrics 
+    (export them by tojson or tocsv). Customized chunks IO can be 
+    measured by self.metrics.measure.
+
+    operate workers can be a Cluster, chunks and pairs tasks then run 
+    on workers processes of other hosts (see clusterworker), tasks 
+    prefer workers of their chunks hosts by chunkhosts.
     """
-    operation = 'operating ...'
+    operation    = 'operating ...'
+    chunkhosts   = None  # {chunks directory: host}, see taskhosts
+    keepmetrics  = False # keep metrics records, else hooks only
+    codec        = None
+    compression  = None
+    codecfile    = '.codec'
+    manifestfile = '.manifest'
+    joinformat   = 'to_json', {'orient': 'records', 'lines': True}
 
     class StopOperation(Exception): pass
 
     def __init__(self, *, verbosity=False):
         self.verbosity = verbosity
+        self.dircodecs = {}    # chunks dirs recorded codecs
+        self.dircompressions = {}
+        self.manifests = {}    # chunks dirs manifests
+        self.dirtymanifests = set()
+        self.recorded  = None  # worker's manifest entries, see _callworker
+        self.writer    = None  # ChunkWriter, see BigData.operate
+        self.journal   = None  # Journal, see Chunks.operate
+        self.cache     = None  # ChunkCache, see ParallelOnce
+        self.metrics   = Metrics(self.keepmetrics)
         self.init() # simplicity
     
     def init(self): pass
 
-    def joinchunks(self, chunkspaths, opath):
+    # called after the operation loop completes or stops
+    def onoperated(self): pass
+
+    def taskhosts(self, args):
+        "Returns hosts (set) of task args chunks, see Cluster"
+        if not self.chunkhosts: return set()
+        hosts = set()
+        for arg in args:
+            if not isinstance(arg, str): continue
+            path = os.path.abspath(arg)
+            for dirname, host in self.chunkhosts.items():
+                dirname = os.path.abspath(dirname)
+                if path == dirname or path.startswith(dirname + os.sep): 
+                    hosts.add(host)
+        return hosts
+
+    def runtask(self, method, args):
+        "Returns method (name) return value on args, see self.metrics"
+        with self.metrics.task(method, args): 
+            return getattr(self, method)(*args)
+
+    def workerspool(self, workers):
+        """
+        Returns a pool of workers processes forked from the instance 
+        (fork start method where available, else the instance is 
+        pickled to spawned processes).
+        """
+        if isinstance(workers, Cluster): return contextlib.nullcontext()
+        context = (multiprocessing.get_context('fork') if 'fork' in 
+                   multiprocessing.get_all_start_methods() else None)
+        return concurrent.futures.ProcessPoolExecutor(workers, 
+                                            mp_context=context,
+                                            initializer=_initworker, 
+                                            initargs=(self,))
+
+    def runchunks(self, method, tasks, workers=None, pool=None, 
+                        journal=True):
+        """
+        Calls method (name) with every args tuple of tasks iterable 
+        and appends return values to self.results in tasks order. 
+        Tasks run on a pool of workers processes if workers (pool is 
+        reused if passed), instance state set by method in workers is 
+        not seen by the caller (use return values). A StopOperation 
+        cancels outstanding tasks and propagates. Completed tasks 
+        (paths tuples) are recorded in self.journal if any and journal. 
+        workers can be a Cluster, tasks run on its hosts workers.
+        """
+        results, journal = self.results, journal and self.journal
+        if not workers:
+            for args in tasks: 
+                results.append(self.runtask(method, args))
+                if journal: journal.record(args)
+            return
+        if isinstance(workers, Cluster):
+            for args, result, records, entries in workers.run(self, method, 
+                                                              tasks):
+                results.append(result)
+                for record in records: self.metrics.add(record)
+                for entry in entries: self.addentry(*entry)
+                if journal: journal.record(args)
+            return
+        owned   = pool is None
+        if owned: pool = self.workerspool(workers)
+        pending = collections.deque()
+        def collect():
+            args, future = pending.popleft()
+            result, records, entries = future.result()
+            results.append(result)
+            for record in records: self.metrics.add(record)
+            for entry in entries: self.addentry(*entry)
+            if journal: journal.record(args)
+        try:
+            for args in tasks:
+                pending.append((args, pool.submit(_callworker, method, *args)))
+                # bounds tasks (ie. chunks data) in flight
+                if len(pending) >= 2 * workers: collect()
+            while pending: collect()
+        finally: 
+            for args, future in pending: future.cancel()
+            if owned: pool.shutdown(cancel_futures=True)
+
+    def writecodec(self, chunksdir):
+        "records codec and compression in chunksdir for later loading"
+        if not (self.codec or self.compression): return
+        if self.compression and self.compression not in compressions:
+            raise ValueError('%r compression is not available' % 
+                             self.compression)
+        with open(os.path.join(chunksdir, self.codecfile), 'w') as file:
+            jsonlib.dump({'codec': self.codec, 
+                          'compression': self.compression}, file)
+
+    def chunkcodec(self, chunkpath):
+        "Returns chunkpath codec instance (or None)"
+        dirname = os.path.dirname(chunkpath)
+        if dirname not in self.dircodecs:
+            codec, compression = self.codec, self.compression
+            try:
+                with open(os.path.join(dirname, self.codecfile)) as file:
+                    recorded = jsonlib.load(file)
+                codec       = recorded['codec'] or codec
+                compression = recorded.get('compression')
+            except FileNotFoundError: pass
+            self.dircodecs[dirname] = codecs[codec]() if codec else None
+            self.dircompressions[dirname] = compression
+        return self.dircodecs[dirname]
+
+    def chunkcompression(self, chunkpath):
+        "Returns chunkpath compression name (or None)"
+        self.chunkcodec(chunkpath)
+        return self.dircompressions[os.path.dirname(chunkpath)]
+
+    def openchunk(self, chunkpath, mode='rb'):
+        "Returns chunkpath binary file object, (de)compressed if recorded"
+        compression = self.chunkcompression(chunkpath)
+        if not compression: return open(chunkpath, mode)
+        return compressions[compression](chunkpath, mode)
+
+    def loadchunk(self, chunkpath, columns=None):
+        "loads chunk by codec (or self.cache), columns in columns only"
+        if self.cache is not None:
+            data = self.cache.get(chunkpath)
+            if data is not None: return pdmgr.project(data, columns)
+        codec = self.chunkcodec(chunkpath)
+        if not codec: raise NotImplementedError('no chunks codec')
+        with self.metrics.measure('load'):
+            with self.openchunk(chunkpath) as file: 
+                # decompressed in memory, seekable (ie. parquet)
+                if self.chunkcompression(chunkpath): 
+                    file = io.BytesIO(file.read())
+                if columns is None: data = codec.load(file)
+                else: data = codec.loadcolumns(file, columns)
+        self.metrics.count(rowsin=len(data), 
+                           bytesin=os.path.getsize(chunkpath))
+        if self.cache is not None and columns is None: 
+            self.cache.add(chunkpath, data)
+        return data
+
+    def dumpchunk(self, data, chunkpath):
+        if self.cache is not None: return self.cache.put(chunkpath, data)
+        if self.writer: return self.writer.put(data, chunkpath)
+        self.writechunk(data, chunkpath)
+
+    def writechunk(self, data, chunkpath):
+        "dumps chunk by codec now (atomically), see dumpchunk"
+        codec = self.chunkcodec(chunkpath)
+        if not codec: raise NotImplementedError('no chunks codec')
+        compression = self.chunkcompression(chunkpath)
+        with self.metrics.measure('dump'):
+            with self.atomicpath(chunkpath) as temppath:
+                # hashed as written, not read back for the manifest
+                with io.BufferedWriter(HashedFile(temppath)) as hashed:
+                    file = hashed
+                    if compression: 
+                        file = compressions[compression](hashed, 'wb')
+                    with file: codec.dump(data, file)
+            self.recordchunk(chunkpath, data, hashed.raw.hexdigest())
+        self.metrics.count(rowsout=len(data), 
+                           bytesout=os.path.getsize(chunkpath))
+
+    @contextlib.contextmanager
+    def atomicpath(self, chunkpath):
+        """
+        Yields a temporary (hidden) path renamed to chunkpath on success, 
+        thus chunkpath is never half written (ie. in-place dumps).
+        """
+        dirname, name = os.path.split(chunkpath)
+        temppath = os.path.join(dirname, '.%s.tmp' % name)
+        try:
+            yield temppath
+            os.replace(temppath, chunkpath)
+        finally:
+            if os.path.exists(temppath): os.remove(temppath)
+
+    def manifest(self, chunksdir):
+        "Returns chunksdir manifest {name: entry}, loaded once"
+        chunksdir = os.path.normpath(chunksdir)
+        if chunksdir not in self.manifests:
+            try:
+                with open(os.path.join(chunksdir, self.manifestfile)) as file:
+                    self.manifests[chunksdir] = jsonlib.load(file)
+            except FileNotFoundError: self.manifests[chunksdir] = {}
+        return self.manifests[chunksdir]
+
+    def recordchunk(self, chunkpath, data=None, digest=None):
+        "records chunkpath file (and data) entry in its manifest"
+        stat  = os.stat(chunkpath)
+        entry = {'bytes': stat.st_size, 'mtime': stat.st_mtime_ns, 
+                 'hash':  digest or filehash(chunkpath)}
+        if data is not None: 
+            entry['rows']  = len(data)
+            entry['stats'] = pdmgr.stats(data)
+        self.addentry(chunkpath, entry)
+
+    def addentry(self, chunkpath, entry):
+        "adds chunkpath entry to its manifest, returned by workers too"
+        dirname, name = os.path.split(os.path.normpath(chunkpath))
+        self.manifest(dirname)[name] = entry
+        self.dirtymanifests.add(dirname)
+        if self.recorded is not None: self.recorded.append((chunkpath, entry))
+
+    def chunkentry(self, chunkpath):
+        "Returns chunkpath manifest entry if up to date, else None"
+        dirname, name = os.path.split(os.path.normpath(chunkpath))
+        entry = self.manifest(dirname).get(name)
+        if not entry: return None
+        try: stat = os.stat(chunkpath)
+        except FileNotFoundError: return None
+        if (entry['bytes'], entry['mtime']) != (stat.st_size, 
+                                                stat.st_mtime_ns): return None
+        return entry
+
+    def writemanifests(self):
+        "writes recorded manifests of existing chunks dirs"
+        for dirname in self.dirtymanifests:
+            if not os.path.isdir(dirname): continue
+            with open(os.path.join(dirname, self.manifestfile), 'w') as file:
+                jsonlib.dump(self.manifest(dirname), file)
+        self.dirtymanifests.clear()
+
+    def joinchunks(self, chunkspaths, opath, workers=None):
+        """
+        Streams chunks (sorted paths) into opath in kernel, see 
+        copychunk. If workers, opath is preallocated and workers 
+        threads write chunks at precomputed offsets. Binary codecs 
+        chunks are converted by joinformat and compressed chunks are 
+        decompressed (serially). A .gz opath is written as gzip 
+        members, gzip compressed text chunks are copied as is.
+        Chunks are joined on this host, serially if workers is a 
+        Cluster.
+        """
+        if isinstance(workers, Cluster): workers = None
         if not chunkspaths: return # save sys resources
         if self.verbosity: print('joining   ...')
-        chunkspaths.sort()
-        file = open(opath, 'wb')
-        for chunkpath in chunkspaths:
-            file.write(open(chunkpath, 'rb').read())
-        file.close()
-
-    def clean(self, chunksdir):
+        chunkspaths.sort(key=naturalkey)
+        timer = Timer()
+        timer.start()
+        binary  = [codec and codec.binary for codec in 
+                   map(self.chunkcodec, chunkspaths)]
+        gzipped = opath.endswith('.gz')
+        # chunks bytes copied as is, else converted or decompressed
+        copied  = [not tojoin and self.chunkcompression(chunkpath) == (
+                   'gzip' if gzipped else None) 
+                   for chunkpath, tojoin in zip(chunkspaths, binary)]
+        with open(opath, 'wb', buffering=0) as ofile:
+            if not all(copied):
+                method, kwargs = self.joinformat
+                for chunkpath, tojoin, copy in zip(chunkspaths, binary, copied):
+                    if copy: 
+                        copychunk(chunkpath, ofile)
+                        continue
+                    member = (gzip.GzipFile(fileobj=ofile, mode='wb', 
+                                            compresslevel=6) if gzipped else 
+                              contextlib.nullcontext(ofile))
+                    with member as out:
+                        if tojoin:
+                            text = getattr(self.loadchunk(chunkpath), 
+                                           method)(None, **kwargs)
+                            out.write(text.encode())
+                            continue
+                        with self.openchunk(chunkpath) as file:
+                            shutil.copyfileobj(file, out, 2 ** 20)
+                nbytes = ofile.tell()
+            elif not workers:
+                nbytes = sum(copychunk(chunkpath, ofile) 
+                             for chunkpath in chunkspaths)
+            else:
+                sizes   = [os.path.getsize(path) for path in chunkspaths]
+                offsets = list(itertools.accumulate([0] + sizes[:-1]))
+                nbytes  = sum(sizes)
+                try:    os.posix_fallocate(ofile.fileno(), 0, nbytes)
+                except (AttributeError, OSError): ofile.truncate(nbytes)
+                with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+                    for ncopied in pool.map(copychunk, chunkspaths, 
+                                            itertools.repeat(ofile), offsets):
+                        pass
+        timer.stop()
+        if self.verbosity: 
+            secs = max(timer.stopped - timer.started, 1e-9)
+            print('=> joined     : %s MB' % round(nbytes / (10 ** 6), 6))
+            print('   rate       : %s MB/s' % round(nbytes / (10 ** 6) / secs, 2))
+
+    def clean(self, chunksdir, workers=None):
+        "removes chunksdir recursively, directories files by threads"
         if self.verbosity: print('cleaning  ...')
-        os.system('rm -r %s' % chunksdir)
+        if not os.path.isdir(chunksdir): return
+        if isinstance(workers, Cluster): workers = None
+        dirnames = list(scandirs(chunksdir))
+        with concurrent.futures.ThreadPoolExecutor(workers or 
+                                        min(32, len(dirnames))) as pool:
+            for removed in pool.map(removefiles, dirnames): pass
+        for dirname in reversed(dirnames): os.rmdir(dirname)
 
 class BigData(FileSystemMgr):
     """
@@ -88,10 +1118,33 @@ class BigData(FileSystemMgr):
             + nchunks:   precision of chunkspaths (ie.chunksdir-001) 
             + opath:     output file path to join chunks
             + clean:     removes chunksdir recursively if True
+            + workers:   number of processes operating on chunks
+            + prefetch:  chunks parsed ahead of onchunkdata by a thread
+            + writebehind: chunks queued to dumpchunk thread at most
+
+    prefetch and writebehind overlap parsing and dumping chunks with 
+    onchunkdata, memory is bound by queues depths. They are ignored 
+    with workers, parsing in the caller already overlaps workers.
+
+    If fanout, chunks are sharded into subdirectories of fanout chunks 
+    (ie. chunksdir/002/chunksdir-002345), chunks names order by numbers 
+    (see naturalkey) even if nchunks isn't passed.
+
+    If codec, it's recorded in chunksdir and onchunkdata can dump 
+    chunks by dumpchunk method. If compression (see compressions), 
+    it's recorded too and dumpchunk compresses chunks. Chunks are 
+    recorded in chunksdir manifest, with data statistics if dumped by 
+    dumpchunk.
+
+    onchunkdata return values are collected in self.results in chunks 
+    order. If workers, chunks data are pickled to a pool of processes 
+    forked from the instance, thus return values should be used 
+    instead of instance state. A RangeReader data is parsed in the 
+    workers processes, only byte ranges are passed to them.
     """
-    def operate(self, data, chunksdir, nchunks=None, opath=None, clean=False):
-        """
-        """
+    fanout = None
+    def operate(self, data, chunksdir, nchunks=None, opath=None, clean=False,
+                      workers=None, prefetch=None, writebehind=None):
         if self.verbosity: print(self.operation)
 
         #**********************************************
@@ -99,15 +1152,30 @@ class BigData(FileSystemMgr):
         #**********************************************
         # make chunksdir if not yet 
         os.mkdir(chunksdir)           # check for existence?
+        self.writecodec(chunksdir)
         chunkname        = chunksdir.split(os.sep)[-1]
         chunkspaths      = []
         self.chunksdir   = chunksdir    # for higher classes use
         self.chunkspaths = chunkspaths  # for higher classes use
-        timer = Timer() # create timer
-        timer.start()   # start  timer
-        try:
-        # starts operation loop ..........................................
+        self.results     = []           # onchunkdata return values
+        # parse byte ranges in workers processes
+        method = 'onchunkdata'
+        if workers and isinstance(data, RangeReader):
+            method, self.rangereader, data = '_onchunkrange', data, data.ranges
+        def shard(chunknum):
+            "Returns chunknum shard subdirectory name (made once)"
+            if not self.fanout: return ''
+            shardnum = (chunknum - 1) // self.fanout
+            digits   = len(str((nchunks - 1) // self.fanout)) if nchunks else 1
+            name     = '%0*d' % (digits, shardnum)
+            if (chunknum - 1) % self.fanout == 0:
+                os.mkdir(os.path.join(chunksdir, name))
+                self.writecodec(os.path.join(chunksdir, name))
+            return name
+        def tasks():
+            clock = time.perf_counter()     # parsing time
             for chunknum, chunkdata in enumerate(data, 1):
+                loaded = time.perf_counter() - clock
                 if self.verbosity > 1: print('\t', 'chunk:', '[',chunknum,']')
                 if nchunks:
                     chunkpath = str(len(str(nchunks))) # digits precision
@@ -115,24 +1183,61 @@ class BigData(FileSystemMgr):
                     chunkpath = chunkpath % chunknum
                 else: 
                     chunkpath = chunkname + '-' + str(chunknum)
-                chunkpath = os.path.join(chunksdir, chunkpath)
+                chunkpath = os.path.join(chunksdir, shard(chunknum), chunkpath)
                 chunkspaths.append(chunkpath)
-                # operate on every chunk
-                # stops operation loop or ................................
-                self.onchunkdata(chunkdata, chunkpath)
+                rows = len(chunkdata) if hasattr(chunkdata, 'columns') else 0
+                self.metrics.expect(chunkpath, load=loaded, rowsin=rows)
+                yield chunkdata, chunkpath
+                clock = time.perf_counter()
+        if prefetch and not workers: 
+            data = prefetched(data, prefetch, self.metrics.queues)
+        if writebehind and not workers: 
+            self.writer = ChunkWriter(lambda data, chunkpath: self.runtask(
+                                      'writechunk', (data, chunkpath)), 
+                                      writebehind)
+            self.metrics.queues['writebehind'] = self.writer.chunks
+        timer = Timer() # create timer
+        timer.start()   # start  timer
+        try:
+        # starts operation loop ..........................................
+            # operate on every chunk
+            # stops operation loop or ....................................
+            self.runchunks(method, tasks(), workers)
         # completes operation loop .......................................
-        except self.StopOperation: pass
+        except self.StopOperation: 
+            # remove chunks dumped in workers past the stopping one
+            for chunkpath in chunkspaths[len(self.results) + 1:]:
+                if os.path.exists(chunkpath): os.remove(chunkpath)
+            del chunkspaths[len(self.results) + 1:]
+        finally:
+            if prefetch and not workers: data.close()
+            if self.writer: 
+                writer, self.writer = self.writer, None
+                writer.close()
+            self.metrics.queues.clear()
+            self.metrics.expected.clear()
+        self.onoperated()
+        # manifest chunks not dumped by dumpchunk
+        for chunkpath in chunkspaths:
+            if os.path.exists(chunkpath) and not self.chunkentry(chunkpath):
+                self.recordchunk(chunkpath)
+        self.writemanifests()
         timer.stop()    # stop timer
         if self.verbosity:
-            print('=> chunks     : %s' % chunknum)
+            print('=> chunks     : %s' % len(chunkspaths))
             print('   time taken : %s' % timer.timetaken())
 
-        if opath: self.joinchunks(chunkspaths, opath)
+        if opath: self.joinchunks(chunkspaths, opath, workers)
 
-        if clean: self.clean(chunksdir)
+        if clean: self.clean(chunksdir, workers)
 
         if self.verbosity: print('done!\n\n')
     def onchunkdata(self, data, chunkpath): raise NotImplementedError
+    def _onchunkrange(self, byterange, chunkpath):
+        with self.metrics.measure('load'): 
+            data = self.rangereader.read(*byterange)
+        self.metrics.count(rowsin=len(data), bytesin=byterange[1] - byterange[0])
+        return self.onchunkdata(data, chunkpath)
     
 class Chunks(FileSystemMgr):
     """
@@ -145,7 +1250,8 @@ class Chunks(FileSystemMgr):
     reformatting, transforming, etc ...). onchunkdata takes a path 
     to a data chunk that can be used to load the data in memory and 
     perform in-place operations on the chunk (just use same path to 
-    dump back).
+    dump back), ie. by loadchunk and dumpchunk methods. Hidden files 
+    (ie. codecfile) are not chunks.
 
     Calling the operate method, starts the scalar operations accross 
     chunks. For simplicity, call operate with desired arguments in 
@@ -154,40 +1260,148 @@ class Chunks(FileSystemMgr):
             + chunksdir: hierarchical directory of data chunks 
             + opath:     output file path to join chunks
             + clean:     removes chunksdir recursively if True
+            + workers:   number of processes operating on chunks
+            + resume:    skips tasks completed by a failed operation
+            + incremental: skips chunks unchanged since last operation
+
+    onchunkpath return values are collected in self.results in chunks 
+    order. If workers, chunks paths are passed to a pool of processes 
+    forked from the instance, thus return values should be used 
+    instead of instance state.
+
+    If resume or incremental (opt-in, else chunksdir isn't written), 
+    completed tasks (chunks, pairs by self chunk) are recorded in a 
+    journalfile in chunksdir, removed when the operation completes 
+    (or stops). Thus, a failed operation is resumable, given in-place 
+    dumps are atomic (ie. dumpchunk, atomicpath) and tasks are 
+    idempotent (a self chunk pairs rerun). A completed operation 
+    records its chunks states in a statefile too, chunks with same 
+    bytes and mtime (or manifest hash) are unchanged in later 
+    incremental operations.
     """
-    def operate(self, chunksdir, opath=None, clean=False):
+    journalfile = '.journal'
+    statefile   = '.state'
+    def operate(self, chunksdir, opath=None, clean=False, workers=None, 
+                      resume=False, incremental=False):
         if self.verbosity: print(self.operation)
 
         # collect paths for processing
-        chunkspaths = []
-        for dirname, subdirs, filenames in os.walk(chunksdir):
-            if filenames: chunkspaths.extend([os.path.join(dirname, filename) 
-                                            for filename in filenames])
-        chunkspaths.sort()             # corrupts data if not called
+        chunkspaths = self.findchunks(chunksdir)
 
         self.chunksdir   = chunksdir   # for use in higher classes (state)
         self.chunkspaths = chunkspaths # for use in higher classes (state)
+        self.chunkranks  = {path: num for num, path in enumerate(chunkspaths)}
+        self.results     = []          # onchunkpath return values
+        # operation (class) specific checkpoints, if requested
+        operation   = '-' + self.__class__.__name__
+        statepath   = os.path.join(chunksdir, self.statefile + operation)
+        checkpoints = resume or incremental
+        self.unchanged = self.unchangedchunks(statepath) if incremental else set()
+        self.journal   = Journal(os.path.join(chunksdir, 
+                                              self.journalfile + operation),
+                                 resume) if checkpoints else None
 
         timer = Timer() # create timer
         timer.start()   # start  timer
+        chunknum = len(chunkspaths)
+        stopped  = False
         try:
         # starts operation loop .............................................
-            for chunknum, chunkpath in enumerate(self.chunkspaths, 1):
-                if self.verbosity > 1: print('\t', 'chunkpath:', '[',chunkpath,']')
-                # stops operation loop or ...................................
-                self.onchunkpath(chunkpath)
+            # stops operation loop or .......................................
+            self.operatepaths(workers)
         # completes operation loop ..........................................
-        except self.StopOperation: pass 
+        except self.StopOperation: 
+            chunknum, stopped = len(self.results) + 1, True
+        except:
+            # keep journal for resuming
+            if self.journal: self.journal.close()
+            self.journal = None
+            raise
+        self.onoperated()
+        self.writemanifests()
+        if checkpoints and not stopped: self.writestate(statepath)
+        if self.journal: self.journal.close(remove=True)
+        self.journal = None
         timer.stop()    # stop timer
         if self.verbosity:
             print('=> chunks     : %s' % chunknum)
             print('   time taken : %s' % timer.timetaken())
 
-        if opath: self.joinchunks(chunkspaths, opath)
+        if opath: self.joinchunks(chunkspaths, opath, workers)
 
-        if clean: self.clean(chunksdir)
+        if clean: self.clean(chunksdir, workers)
 
         if self.verbosity: print('done!\n\n')
+    def findchunks(self, chunksdir):
+        """
+        Returns chunks paths of chunksdir hierarchy in order (see 
+        naturalkey). Chunks of a directory with a manifest are its 
+        entries (no listing, subdirectories not scanned), else 
+        directories are scanned by os.scandir.
+        """
+        chunkspaths = []
+        def scan(dirname):
+            if os.path.exists(os.path.join(dirname, self.manifestfile)):
+                chunkspaths.extend([os.path.join(dirname, filename) 
+                                    for filename in self.manifest(dirname)
+                                    if not filename.startswith('.')])
+                return
+            subdirs = []
+            with os.scandir(dirname) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'): continue
+                    if entry.is_dir(): subdirs.append(entry.path)
+                    else:              chunkspaths.append(entry.path)
+            for subdir in subdirs: scan(subdir)
+        scan(chunksdir)
+        chunkspaths.sort(key=naturalkey) # corrupts data if not called
+        return chunkspaths
+
+    def unchangedchunks(self, statepath):
+        "Returns chunks paths unchanged since statepath was written"
+        try:
+            with open(statepath) as file: states = jsonlib.load(file)
+        except FileNotFoundError: return set()
+        unchanged = set()
+        for chunkpath in self.chunkspaths:
+            state = states.get(chunkpath)
+            if not state: continue
+            try: stat = os.stat(chunkpath)
+            except FileNotFoundError: continue
+            entry = self.chunkentry(chunkpath)
+            if ((state['bytes'], state['mtime']) == (stat.st_size, 
+                                                     stat.st_mtime_ns) or 
+                (entry and state['hash'] and entry['hash'] == state['hash'])):
+                unchanged.add(chunkpath)
+        return unchanged
+
+    def writestate(self, statepath):
+        "records chunks states (bytes, mtime and manifest hash)"
+        if not os.path.isdir(self.chunksdir): return
+        states = {}
+        for chunkpath in self.chunkspaths:
+            try: stat = os.stat(chunkpath)
+            except FileNotFoundError: continue
+            entry = self.chunkentry(chunkpath)
+            states[chunkpath] = {'bytes': stat.st_size, 
+                                 'mtime': stat.st_mtime_ns,
+                                 'hash':  entry and entry['hash']}
+        with self.atomicpath(statepath) as temppath:
+            with open(temppath, 'w') as file: jsonlib.dump(states, file)
+
+    def skipped(self, task):
+        "True if task (paths tuple) is journaled or its chunks unchanged"
+        if self.journal and task in self.journal: return True
+        return all(path in self.unchanged for path in task)
+
+    def operatepaths(self, workers=None):
+        "runs onchunkpath on every chunk path, see runchunks"
+        def tasks():
+            for chunkpath in self.chunkspaths:
+                if self.skipped((chunkpath,)): continue
+                if self.verbosity > 1: print('\t', 'chunkpath:', '[',chunkpath,']')
+                yield chunkpath,
+        self.runchunks('onchunkpath', tasks(), workers)
     def onchunkpath(self, chunkpath): raise NotImplementedError
 
 class ParallelRepeat(Chunks):
@@ -213,13 +1427,54 @@ class ParallelRepeat(Chunks):
         + parallelpath: a single path of the re-iteration by selfpath 
 
 
+    If operate workers, pairs are scheduled in rounds (see rounds) 
+    where no chunk path appears twice, and every round pairs run on 
+    the workers pool. Thus, in-place pairs operations never race on 
+    a chunk, given pairs operations results don't depend on pairs 
+    order (ie. dropping duplicates). Then, onparallel can't rely on 
+    state of a previous pair (ie. selfpath data), reload it.
+
     * NOTE: performs (nchunks ** 2) loop runs
     """
+    def operatepaths(self, workers=None):
+        if not workers: return Chunks.operatepaths(self)
+        # self chunks journaled after their last round, not pairs
+        lastround = {selfpath: roundnum for roundnum, pairs 
+                     in enumerate(self.rounds(), 1) 
+                     for selfpath, parallelpath in pairs}
+        with self.workerspool(workers) as pool:
+            for roundnum, pairs in enumerate(self.rounds(), 1):
+                if self.verbosity > 1: print('\t', 'round:', '[',roundnum,']')
+                pairs = [pair for pair in pairs if not self.skipped(pair)]
+                self.runchunks('onparallel', pairs, workers, pool, 
+                               journal=False)
+                if not self.journal: continue
+                for selfpath in self.chunkspaths:
+                    if (lastround[selfpath] == roundnum and 
+                        not self.skipped((selfpath,))): 
+                        self.journal.record((selfpath,))
+    def rounds(self):
+        "Yields rounds of independent (selfpath, parallelpath) pairs"
+        yield [(path, path) for path in self.chunkspaths]
+        for pairs in roundrobin(self.chunkspaths): yield pairs
+        for pairs in roundrobin(self.chunkspaths): 
+            yield [(path2, path1) for path1, path2 in pairs]
+    def skipped(self, task):
+        # pairs are journaled per selfpath, selfpath tasks skip 
+        # unchanged pairs only
+        journaled = bool(self.journal and task[:1] in self.journal)
+        if len(task) == 1: return journaled
+        return journaled or Chunks.skipped(self, task)
+    def parallelpaths(self, selfpath):
+        "Returns chunks paths paired with selfpath"
+        return self.chunkspaths
     def onchunkpath(self, selfpath):
         # starts parallel operation loop ..........................
-        for parallelpath in self.chunkspaths:
+        for parallelpath in self.parallelpaths(selfpath):
+            pair = selfpath, parallelpath
+            if self.skipped(pair): continue
             # stops parallel operation loop or ....................
-            self.onparallel(selfpath, parallelpath)
+            self.runtask('onparallel', pair)
         # completes parallel operation ............................
     def onparallel(self, selfpath, parallelpath):
         raise NotImplementedError
@@ -247,13 +1502,95 @@ class ParallelOnce(ParallelRepeat):
         + selfpath:     path that re-iterates the chunks hierarchy
         + parallelpath: a single path of the re-iteration by selfpath 
 
+    If prunekeys (columns labels, or True for all columns), pairs 
+    whose rows can't be equal on all prunekeys (see disjoint) by 
+    up to date manifests statistics are skipped.
+
+    If blocksize (without workers), pairs run in a block nested loop: 
+    blocksize self chunks at most (and budget MB of loaded chunks if 
+    not None) stay resident in self.cache (ChunkCache), every later 
+    chunk is paired with the block self chunks in turn, thus loaded 
+    once per block instead of once per self chunk. Dumps are written 
+    back lazily (a parallel chunk once per block), the block self 
+    chunks are journaled when it's written back.
+
     * NOTE: performs math.factorial(nchunks) loop runs
     """
+    prunekeys = None
+    blocksize = None # self chunks per block, see operatepaths
+    budget    = None # MB of resident chunks in a block, unbounded if None
+    def operatepaths(self, workers=None):
+        if workers or not self.blocksize: 
+            return ParallelRepeat.operatepaths(self, workers)
+        self.cache = ChunkCache(self.writechunk, self.budget)
+        try:
+            start = 0
+            while start < len(self.chunkspaths):
+                block = self.chunkspaths[start:start + self.blocksize]
+                # block pairs, block grows until blocksize or budget
+                for num, parallelpath in enumerate(block):
+                    for selfpath in [parallelpath] + block[:num]:
+                        self.runpair(selfpath, parallelpath)
+                    if (self.cache.budget and 
+                        self.cache.nbytes >= self.cache.budget): 
+                        block = block[:num + 1]
+                        break
+                if self.verbosity > 1: 
+                    print('\t', 'block:', '[',block[0],']', len(block))
+                # later chunks streamed once per block
+                for parallelpath in self.chunkspaths[start + len(block):]:
+                    for selfpath in block:
+                        self.runpair(selfpath, parallelpath)
+                    self.cache.release(parallelpath)
+                self.cache.clear()
+                if self.journal: 
+                    for selfpath in block: 
+                        if not self.skipped((selfpath,)): 
+                            self.journal.record((selfpath,))
+                start += len(block)
+        finally:
+            cache, self.cache = self.cache, None
+            cache.clear()
+    def runpair(self, selfpath, parallelpath):
+        "runs onparallel on a pair unless skipped"
+        pair = selfpath, parallelpath
+        if self.skipped(pair): return
+        self.runtask('onparallel', pair)
+    def parallelpaths(self, selfpath):
+        # chunks paths from selfpath on (chunks order), see onparallel
+        return self.chunkspaths[self.chunkranks[selfpath]:]
+    def rounds(self):
+        yield [(path, path) for path in self.chunkspaths]
+        for pairs in roundrobin(self.chunkspaths): 
+            yield [tuple(sorted(pair, key=self.chunkranks.get)) 
+                   for pair in pairs]
     def onparallel(self, selfpath, parallelpath):
-        if not parallelpath >= selfpath: return
+        if self.chunkranks[parallelpath] < self.chunkranks[selfpath]: return
+        if (self.prunekeys and selfpath != parallelpath and 
+            self.disjoint(selfpath, parallelpath)): return
         if self.verbosity > 2: 
             print('\t\t', 'parallelpath:', '[',parallelpath,']')
         self.onparallelonce(selfpath, parallelpath)
+    def disjoint(self, path1, path2):
+        """
+        True if manifests statistics prove path1 and path2 chunks rows 
+        are never equal on all prunekeys, ie. a key has non overlapping 
+        ranges (and nulls in one chunk at most).
+        """
+        entry1, entry2 = self.chunkentry(path1), self.chunkentry(path2)
+        if not (entry1 and entry2): return False
+        stats1, stats2 = entry1.get('stats'), entry2.get('stats')
+        if not (stats1 and stats2): return False
+        keys = stats1 if self.prunekeys is True else map(str, self.prunekeys)
+        for key in keys:
+            key1, key2 = stats1.get(key), stats2.get(key)
+            if not (key1 and key2 and 'min' in key1 and 'min' in key2): 
+                continue
+            if key1['nulls'] and key2['nulls']: continue  # nulls match
+            if key1['min'] is None or key2['min'] is None: return True
+            if key1['max'] < key2['min'] or key2['max'] < key1['min']: 
+                return True
+        return False
     def onparallelonce(self, selfpath, parallelpath): 
         raise NotImplementedError
 
@@ -261,6 +1598,126 @@ class ParallelOnce(ParallelRepeat):
 ################################################################
 # pandas system interfaces, they customize BigData
 ################################################################
+def byteranges(ipath, chunksize, start=0):
+    """
+    Returns newline aligned (start, end) byte ranges of about chunksize 
+    MB each of a line delimited file. The file is seeked at every 
+    chunksize MB and snapped forward to the next newline, not scanned.
+    """
+    fsize  = os.path.getsize(ipath)
+    step   = max(int(chunksize * (10 ** 6)), 1)
+    ranges = []
+    with open(ipath, 'rb') as file:
+        while start < fsize:
+            end = linestart(file, start + step, fsize)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def linestart(file, end, fsize):
+    "Returns end snapped forward to a line start of file (fsize bytes)"
+    if end >= fsize: return fsize
+    file.seek(end - 1)
+    file.readline()
+    return file.tell()
+
+class RangeReader:
+    """
+    Iterable of data chunks parsed by a pandas reader (ie. 'read_json') 
+    from independent byte ranges of a line delimited file, see 
+    byteranges. The header bytes (ie. csv columns line) are prepended 
+    to every range. A range is parsed by the read method, thus ranges 
+    can be parsed separately (ie. BigData workers processes).
+    """
+    def __init__(self, reader, ipath, ranges, header=b'', **kwargs):
+        self.reader = reader
+        self.ipath  = ipath
+        self.ranges = ranges
+        self.header = header
+        self.kwargs = kwargs
+    def __len__(self): return len(self.ranges)
+    def __iter__(self):
+        for start, end in self.ranges: yield self.read(start, end)
+    def read(self, start, end):
+        with open(self.ipath, 'rb') as file:
+            file.seek(start)
+            data = self.header + file.read(end - start)
+        return getattr(pd, self.reader)(io.BytesIO(data), **self.kwargs)
+
+class BudgetReader:
+    """
+    Iterable of data chunks parsed by a pandas reader (ie. 'read_json') 
+    from byte ranges of a line delimited file, sized to a memory budget 
+    (MB) of parsed chunks. Parsed chunks memory (memory_usage deep) 
+    per file byte is measured and later ranges are resized to fill 
+    budget, as memory per byte varies across the file. If downcast, 
+    chunks dtypes are downcast (see _pdmgr.downcast, categories arg) 
+    once parsed, ranges are sized by the parsing peak still. Effective 
+    chunks sizes are recorded in sizes, see report.
+    """
+    expansion = 10    # guessed memory per file byte of the first chunk
+    fill      = 0.9   # budget fraction targeted, headroom
+    minbytes  = 2 ** 16
+    def __init__(self, reader, ipath, budget, header=b'', start=0, *, 
+                       downcast=False, categories=0.5, **kwargs):
+        self.rangereader = RangeReader(reader, ipath, [], header, **kwargs)
+        self.ipath       = ipath
+        self.budget      = budget * (10 ** 6)
+        self.start       = start
+        self.downcast    = downcast
+        self.categories  = categories
+        self.sizes       = []
+    def __len__(self):
+        "Returns chunks count upper bound (ie. chunks paths precision)"
+        fsize = os.path.getsize(self.ipath) - self.start
+        return max(math.ceil(fsize / self.minbytes), 1)
+    def __iter__(self):
+        fsize, start = os.path.getsize(self.ipath), self.start
+        ratio = self.expansion
+        with open(self.ipath, 'rb') as file:
+            while start < fsize:
+                step = max(int(self.budget * self.fill / ratio), self.minbytes)
+                end  = linestart(file, start + step, fsize)
+                data   = self.rangereader.read(start, end)
+                parsed = int(data.memory_usage(deep=True).sum())
+                if self.downcast: data = pdmgr.downcast(data, self.categories)
+                memory = int(data.memory_usage(deep=True).sum())
+                # resize later ranges by measured peak memory per byte
+                ratio = max(max(parsed, memory) / (end - start), 1e-3)
+                self.sizes.append({'start': start, 'end': end, 
+                                   'bytes': end - start, 'rows': len(data), 
+                                   'parsed': parsed, 'memory': memory})
+                yield data
+                start = end
+    def report(self):
+        "Returns a frame of effective chunks sizes (memory in bytes)"
+        return pd.DataFrame(self.sizes, columns=['start', 'end', 'bytes', 
+                                                 'rows', 'parsed', 'memory'])
+
+class BsonReader(RangeReader):
+    """
+    Iterable of data frames decoded from batches of documents of a 
+    BSON file (ie. mongodump collection) without bsondump, see 
+    _jsonmgr.bson_ranges. Batches (byte ranges) of rows documents or 
+    about mb MB are decoded from a memory mapped file into frames by 
+    _jsonmgr.to_frame (usecols and normalize args). As RangeReader, 
+    BigData workers processes decode ranges in parallel.
+    """
+    def __init__(self, ipath, *, rows=None, mb=None, **kwargs):
+        RangeReader.__init__(self, 'read_bson', ipath, 
+                             json.bson_ranges(ipath, rows, mb), **kwargs)
+    def __iter__(self):
+        if not self.ranges: return
+        with open(self.ipath, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                for start, end in self.ranges: 
+                    yield self.frame(json.bson_decode(buffer, start, end))
+    def read(self, start, end):
+        with open(self.ipath, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return self.frame(json.bson_decode(buffer, start, end))
+    def frame(self, docs): return json.to_frame(docs, **self.kwargs)
+
 # pandas mixin
 class PandasIO:
     "pandas loading and dumping (IO) interface mixin."
@@ -271,8 +1728,45 @@ class PandasIO:
         #****************************************************
         # intercepts pandas.read_* functions for file reading
         #****************************************************
-        def read_(ipath, *, mb=False, **kwargs):
-            "Intercepts pandas read_* to optionally take chunksize in MB"
+        def read_(ipath, *, mb=False, ranges=False, budget=None, **kwargs):
+            """
+            Intercepts pandas read_* to optionally take chunksize in MB. 
+            If ranges, a line delimited file is chunked in byte ranges 
+            (no lines counting) and (RangeReader, nchunks, None) is 
+            returned. read_bson returns (BsonReader, nchunks, None) of 
+            chunksize documents (MB if mb) batches. If budget (MB), a 
+            line delimited file is chunked to budget parsed chunks and 
+            (BudgetReader, nchunks upper bound, None) is returned.
+            """
+            def csvheader(ipath):
+                "Returns csv (header line, bytes), prepended to ranges"
+                if (attr != 'read_csv' or 
+                    kwargs.get('header', 'infer') != 'infer'): return b'', 0
+                with open(ipath, 'rb') as file: header = file.readline()
+                return header, len(header)
+            def mb_to_ranges(ipath, chunksize):
+                "Returns a RangeReader of chunksize MB ranges"
+                header, start = csvheader(ipath)
+                reader = RangeReader(attr, ipath, 
+                                     byteranges(ipath, chunksize, start), 
+                                     header, **kwargs)
+                if self.verbosity: 
+                    print('=> file path  : %s'    % ipath)
+                    print('   file size  : %s MB' % (os.path.getsize(ipath) 
+                                                     / (10 ** 6)))
+                    print('   chunks     : %s'    % len(reader))
+                return reader
+            def budget_to_ranges(ipath, budget):
+                "Returns a BudgetReader of budget MB parsed chunks"
+                header, start = csvheader(ipath)
+                reader = BudgetReader(attr, ipath, budget, header, start, 
+                                      **kwargs)
+                if self.verbosity: 
+                    print('=> file path  : %s'    % ipath)
+                    print('   file size  : %s MB' % (os.path.getsize(ipath) 
+                                                     / (10 ** 6)))
+                    print('   budget     : %s MB' % budget)
+                return reader
             def mb_to_lines(ipath, chunksize):
                 "Converts chunksize from MB to nlines"
                 if self.verbosity: print('counting ...')
@@ -293,6 +1787,26 @@ class PandasIO:
                     print('   nlines     : %s'    % nlines)
                 return nlines, nchunks
             
+            if budget:
+                kwargs.pop('chunksize', None)
+                reader = budget_to_ranges(ipath, budget)
+                return reader, len(reader), None
+
+            # BSON documents batches, chunksize in MB or documents
+            if attr == 'read_bson':
+                chunksize = kwargs.pop('chunksize', None)
+                reader    = BsonReader(ipath, rows=None if mb else chunksize, 
+                                       mb=chunksize if mb else None, **kwargs)
+                if self.verbosity: 
+                    print('=> file path  : %s'    % ipath)
+                    print('   chunks     : %s'    % len(reader))
+                return reader, len(reader), None
+
+            if mb and ranges and kwargs.get('chunksize'):
+                chunksize = kwargs.pop('chunksize')
+                reader    = mb_to_ranges(ipath, chunksize)
+                return reader, len(reader), None
+
             # emulate pd chunksize protocol and keep the rest
             try:
                 if mb and kwargs['chunksize']: 
@@ -340,24 +1854,837 @@ class SamplePd(BigData):
             raise self.StopOperation
     def onsample(self, sample, chunkpath): self.sample = sample
 
+class AggregateMixin:
+    """
+    Aggregation interface mixin of BigData and Chunks, see AggregatePd 
+    and AggregateChunksPd. Every chunk is aggregated into partials 
+    (see _pdmgr.partials) returned to self.results (across workers 
+    processes if passed), partials are combined by associative 
+    combiners into self.aggregated (a pandas agg like DataFrame).
+        - constructor args:
+            + by:   groupby keys (label or labels), a group if None
+            + spec: {column: func or funcs}, funcs count, sum, min, 
+                    max, mean, var and std
+            + ddof: var and std delta degrees of freedom
+    """
+    operation = 'aggregating ...'
+    def __init__(self, by, spec, *, ddof=1, verbosity=False):
+        pdmgr.aggspec(spec) # fail early
+        self.by, self.spec, self.ddof = by, spec, ddof
+        self.aggregated = None
+        super().__init__(verbosity=verbosity)
+    def aggregate(self, data):
+        "Returns data chunk partials"
+        return pdmgr.partials(data, self.by, self.spec)
+    def onoperated(self):
+        combined = pdmgr.combine(self.results)
+        self.aggregated = pdmgr.finalize(combined, self.spec, self.ddof)
+
+class AggregatePd(AggregateMixin, BigData):
+    """
+    pandas groupby aggregation emulation of parsed data chunks in one 
+    pass, nothing is dumped (chunksdir is still made, clean it), see 
+    AggregateMixin.
+    """
+    def onchunkdata(self, data, chunkpath): return self.aggregate(data)
+
+class AggregateChunksPd(AggregateMixin, Chunks):
+    """
+    pandas groupby aggregation emulation for data chunks directory, 
+    chunks are loaded by loadchunk, see AggregateMixin.
+    """
+    def onchunkpath(self, chunkpath): 
+        return self.aggregate(self.loadchunk(chunkpath))
+
+class SketchMixin:
+    """
+    Mergeable sketches interface mixin of BigData and Chunks, see 
+    SketchPd and SketchChunksPd. Every chunk columns are sketched (see 
+    _sketchmgr.sketches) into (chunkpath, {column: {kind: sketch}}) 
+    returned to self.results (across workers processes if passed), 
+    chunks sketches are merged into self.sketches, ie. 
+    self.sketches[column]['distinct'].count(). Quantiles are sketched 
+    for numeric columns only.
+        - constructor args:
+            + columns: columns sketched, all if None
+            + kinds:   sketches kinds, 'distinct' (HyperLogLog), 
+                       'quantiles' (KLL) and 'frequent' (CountMin)
+            + params:  {kind: sketch constructor kwargs}
+
+    Sketches of chunks on disk are persisted next to them, in their 
+    directory sketchfile (pickle) with chunks bytes and mtime. Later 
+    operations of same columns, kinds and params reuse sketches of 
+    unchanged chunks, chunks aren't loaded (see SketchChunksPd).
+    """
+    operation  = 'sketching ...'
+    sketchfile = '.sketches'
+    def __init__(self, columns=None, kinds=tuple(sketchmgr.sketches), *, 
+                       params=None, verbosity=False):
+        for kind in kinds:
+            if kind not in sketchmgr.sketches: 
+                raise ValueError('%r sketch is not supported' % kind)
+        self.columns, self.kinds = columns, tuple(kinds)
+        self.params   = params or {}
+        self.spec     = repr((columns, self.kinds, sorted(self.params.items())))
+        self.sketches = {}
+        self.dirsketches = {}  # chunks dirs persisted sketches
+        super().__init__(verbosity=verbosity)
+    def sketch(self, data):
+        "Returns data chunk sketches {column: {kind: sketch}}"
+        columns  = (data.columns if self.columns is None else 
+                    pdmgr.keycolumns(None, self.columns))
+        sketches = {}
+        for column in columns:
+            values = data[column]
+            numeric = (pd.api.types.is_numeric_dtype(values) and 
+                       not pd.api.types.is_bool_dtype(values))
+            sketches[column] = {kind: sketchmgr.sketches[kind](
+                                      **self.params.get(kind, {})).add(values)
+                                for kind in self.kinds 
+                                if numeric or kind != 'quantiles'}
+        return sketches
+    def loadsketches(self, dirname):
+        "Returns dirname persisted sketches {name: entry}, loaded once"
+        dirname = os.path.normpath(dirname)
+        if dirname not in self.dirsketches:
+            try:
+                with open(os.path.join(dirname, self.sketchfile), 'rb') as file:
+                    self.dirsketches[dirname] = pickle.load(file)
+            except FileNotFoundError: self.dirsketches[dirname] = {}
+        return self.dirsketches[dirname]
+    def chunksketches(self, chunkpath):
+        "Returns chunkpath persisted sketches if up to date, else None"
+        dirname, name = os.path.split(os.path.normpath(chunkpath))
+        entry = self.loadsketches(dirname).get(name)
+        if not entry or entry['spec'] != self.spec: return None
+        try: stat = os.stat(chunkpath)
+        except FileNotFoundError: return None
+        if (entry['bytes'], entry['mtime']) != (stat.st_size, 
+                                                stat.st_mtime_ns): return None
+        return entry['sketches']
+    def persist(self):
+        "records sketches of chunks on disk in their dirs sketchfile"
+        dirnames = set()
+        for chunkpath, sketches in self.results:
+            try: stat = os.stat(chunkpath)
+            except FileNotFoundError: continue
+            dirname, name = os.path.split(os.path.normpath(chunkpath))
+            self.loadsketches(dirname)[name] = {'spec':     self.spec, 
+                                                'bytes':    stat.st_size, 
+                                                'mtime':    stat.st_mtime_ns,
+                                                'sketches': sketches}
+            dirnames.add(dirname)
+        for dirname in dirnames:
+            with self.atomicpath(os.path.join(dirname, 
+                                              self.sketchfile)) as temppath:
+                with open(temppath, 'wb') as file: 
+                    pickle.dump(self.loadsketches(dirname), file, 
+                                pickle.HIGHEST_PROTOCOL)
+    def onoperated(self):
+        self.persist()
+        merged = {}
+        for chunkpath, sketches in self.results:
+            for column, kinds in sketches.items():
+                for kind, sketch in kinds.items():
+                    if kind in merged.setdefault(column, {}): 
+                        merged[column][kind].merge(sketch)
+                    else: merged[column][kind] = copy.deepcopy(sketch)
+        self.sketches = merged
+
+class SketchPd(SketchMixin, BigData):
+    """
+    Sketches of parsed data chunks in one pass, see SketchMixin. 
+    Nothing is dumped, sketches of chunks dumped by a customized 
+    onchunkdata (returning SketchPd.onchunkdata) are persisted.
+    """
+    def onchunkdata(self, data, chunkpath): 
+        return chunkpath, self.sketch(data)
+
+class SketchChunksPd(SketchMixin, Chunks):
+    """
+    Sketches of a data chunks directory, see SketchMixin. Chunks are 
+    loaded (on columns, see loadchunk) unless their persisted sketches 
+    are up to date, thus later sketches need no data scan.
+    """
+    def onchunkpath(self, chunkpath):
+        sketches = self.chunksketches(chunkpath)
+        if sketches is None:
+            columns  = (None if self.columns is None else 
+                        pdmgr.keycolumns(None, self.columns))
+            sketches = self.sketch(self.loadchunk(chunkpath, columns))
+        return chunkpath, sketches
+
 class Drop_DuplicatesPd(ParallelOnce):
-    "pandas drop_dupilcate emulation for data chunks directory"
+    """
+    pandas drop_dupilcate emulation for data chunks directory. Rows 
+    of a self chunk are hashed once into a HashIndex (see _pdmgr) and 
+    probed by rows of its parallel chunks, duplicates on subset 
+    columns (all by default) are dropped from the later chunks. Self 
+    chunks data and indexes are kept per chunk key for a block of self 
+    chunks (see ParallelOnce blocksize).
+    """
     operation = 'dropping duplicates ...'
+    selves    = None # {selfpath: [key, data, HashIndex]}, see selfdata
+    subset    = None # columns labels, all columns if None
+    @property
+    def prunekeys(self): 
+        # duplicates are equal on subset (all) columns
+        if self.subset is None: return True
+        return pdmgr.keycolumns(None, self.subset)
     def onparallelonce(self, selfpath, parallelpath):
         if selfpath == parallelpath:
             data = self.loadself(selfpath)
-            data.drop_duplicates(inplace=True)
+            data.drop_duplicates(self.subset, inplace=True)
             self.dumpself(data)
-            self.data = data
+            self.keepself(selfpath, [self.chunkkey(selfpath), data, None])
             return
-        df2      = self.loadparallel(parallelpath)
-        if self.data.empty or df2.empty: return
-        ign, df2 = pdmgr.drop_duplicates(self.data, df2)
-        self.dumpparallel(df2)
-    def loadself(    self, selfpath    ): raise NotImplementedError
-    def dumpself(    self, selfdata    ): raise NotImplementedError    
-    def loadparallel(self, parallelpath): raise NotImplementedError
-    def dumpparallel(self, paralleldata): raise NotImplementedError
+        # selfpath data changed or not kept (ie. rounds, blocks)
+        entry = self.selfdata(selfpath)
+        df2 = self.loadparallel(parallelpath)
+        if entry[1].empty or df2.empty: return
+        if entry[2] is None: entry[2] = pdmgr.HashIndex(entry[1], self.subset)
+        duplicated = entry[2].isin(df2)
+        if duplicated.any(): self.dumpparallel(df2[~duplicated])
+    def selfdata(self, selfpath):
+        "Returns selfpath [key, data, HashIndex] entry, (re)loaded if changed"
+        entry = (self.selves or {}).get(selfpath)
+        if not entry or entry[0] != self.chunkkey(selfpath):
+            entry = [self.chunkkey(selfpath), self.loadself(selfpath), None]
+        return self.keepself(selfpath, entry)
+    def keepself(self, selfpath, entry):
+        "keeps selfpath entry, for blocksize self chunks at most"
+        if self.selves is None: self.selves = collections.OrderedDict()
+        self.selves[selfpath] = entry
+        self.selves.move_to_end(selfpath)
+        while len(self.selves) > (self.blocksize or 1): 
+            self.selves.popitem(last=False)
+        self.data = entry[1]
+        return entry
+    def chunkkey(self, chunkpath):
+        if self.cache is not None: return self.cache.key(chunkpath)
+        stat = os.stat(chunkpath)
+        return chunkpath, stat.st_mtime_ns, stat.st_size
+    # chunks codec IO by default
+    def loadself(self, selfpath):
+        self.selfpath = selfpath
+        return self.loadchunk(selfpath)
+    def dumpself(self, selfdata): self.dumpchunk(selfdata, self.selfpath)
+    def loadparallel(self, parallelpath):
+        self.parallelpath = parallelpath
+        return self.loadchunk(parallelpath)
+    def dumpparallel(self, paralleldata): 
+        self.dumpchunk(paralleldata, self.parallelpath)
+
+class Drop_DuplicatesHashPd(Chunks):
+    """
+    pandas drop_duplicates emulation for data chunks directory in 
+    linear I/O. Unlike Drop_DuplicatesPd ((nchunks ** 2) / 2 pair 
+    loads), every chunk row is hashed and scattered into bucket files 
+    on disk, then every bucket is deduplicated independently and only 
+    chunks with duplicates are rewritten in-place.
+        - constructor args:
+            + nbuckets: number of hash buckets (a bucket fits in memory)
+            + subset:   columns considered, all columns by default
+            + keep:     'first', 'last' or False as drop_duplicates
+
+    Chunks IO by loadchunk and dumpchunk methods (see codec).
+    """
+    operation = 'dropping duplicates ...'
+    def __init__(self, nbuckets=16, *, subset=None, keep='first', 
+                                       verbosity=False):
+        self.nbuckets  = nbuckets
+        self.subset    = subset
+        self.keep      = keep
+        Chunks.__init__(self, verbosity=verbosity)
+    def operate(self, chunksdir, opath=None, clean=False, workers=None):
+        # buckets next to chunksdir, not collected as chunks
+        self.bucketsdir = chunksdir.rstrip(os.sep) + '-buckets'
+        os.mkdir(self.bucketsdir)
+        try: Chunks.operate(self, chunksdir, opath, clean, workers)
+        finally: shutil.rmtree(self.bucketsdir)
+    def onchunkpath(self, chunkpath):
+        # scatter chunk rows into buckets ..........................
+        data = self.loadchunk(chunkpath)
+        if data.empty: return
+        if self.subset is not None:
+            subset = self.subset
+            if not pd.api.types.is_list_like(subset): subset = [subset]
+            data = data[subset]
+        # rows remember their (chunk, position) origin
+        chunknum   = self.chunkranks[chunkpath]
+        data.index = pd.MultiIndex.from_arrays(
+                                [np.full(len(data), chunknum), 
+                                 np.arange(len(data))])
+        # a bucket file per process (and host), no appends race in workers
+        for bucket, rows in pdmgr.hash_buckets(data, self.nbuckets):
+            bucketpath = os.path.join(self.bucketsdir, str(bucket))
+            os.makedirs(bucketpath, exist_ok=True)
+            bucketpath = os.path.join(bucketpath, processname())
+            pdmgr.dumpframe(rows, bucketpath)
+    def onoperated(self):
+        # drop duplicates per bucket ..............................
+        chunknums, positions = [], []
+        for bucket in sorted(os.listdir(self.bucketsdir), key=int):
+            if self.verbosity > 1: print('\t', 'bucket:', '[',bucket,']')
+            bucketpath = os.path.join(self.bucketsdir, bucket)
+            rows = [frame for filename in os.listdir(bucketpath) 
+                    for frame in pdmgr.loadframes(os.path.join(bucketpath,
+                                                                filename))]
+            rows = pd.concat(rows)
+            # (chunk, position) order, keep relies on it
+            if not rows.index.is_monotonic_increasing: rows.sort_index(inplace=True)
+            dups = rows.index[rows.duplicated(keep=self.keep)]
+            chunknums.append(dups.get_level_values(0).to_numpy())
+            positions.append(dups.get_level_values(1).to_numpy())
+        if not chunknums: return
+        chunknums = np.concatenate(chunknums)
+        positions = np.concatenate(positions)
+        order     = np.argsort(chunknums, kind='stable')
+        chunknums, starts = np.unique(chunknums[order], return_index=True)
+        positions = np.split(positions[order], starts[1:])
+        # rewrite chunks with duplicates only ......................
+        for chunknum, dropped in zip(chunknums, positions):
+            chunkpath = self.chunkspaths[chunknum]
+            data = self.loadchunk(chunkpath)
+            keep = np.ones(len(data), dtype=bool)
+            keep[dropped] = False
+            self.dumpchunk(data[keep], chunkpath)
+
+class Descending:
+    "Reversed order of a value, see SortPd.rowkeys"
+    __slots__ = 'value',
+    def __init__(self, value): self.value = value
+    def __eq__(self, other):   return self.value == other.value
+    def __lt__(self, other):   return other.value < self.value
+
+class SortPd(Chunks):
+    """
+    pandas sort_values emulation for data chunks directory (external 
+    sort). Every chunk is sorted by keys into a run file of blocks 
+    (in workers if passed), then runs are k-way merged block-wise 
+    back into the chunks paths, same rows counts per chunk. Thus, 
+    chunks paths order is the global order (ie. joined opath). Ties 
+    keep chunks order, as a stable sort.
+        - constructor args:
+            + by:        key label or labels list
+            + ascending: bool or bools list (per key)
+            + blockrows: rows of a run block, merge memory per run
+
+    Merging holds a block per run, a heap of runs cursors yields rows 
+    by pieces: rows of the least run up to the least row of the other 
+    runs (binary search in the sorted block), thus about log(runs) 
+    comparisons per piece. Merged rows are taken from blocks at once, 
+    a block per run of them at most. Chunks IO by loadchunk and 
+    dumpchunk methods (see codec).
+    """
+    operation = 'sorting ...'
+    def __init__(self, by, *, ascending=True, blockrows=10 ** 5, 
+                              verbosity=False):
+        self.by        = pdmgr.keycolumns(None, by)
+        if isinstance(ascending, bool): ascending = [ascending] * len(self.by)
+        self.ascending = list(ascending)
+        self.blockrows = blockrows
+        Chunks.__init__(self, verbosity=verbosity)
+    def operate(self, chunksdir, opath=None, clean=False, workers=None):
+        # runs next to chunksdir, not collected as chunks
+        self.runsdir = chunksdir.rstrip(os.sep) + '-runs'
+        os.mkdir(self.runsdir)
+        try: Chunks.operate(self, chunksdir, opath, clean, workers)
+        finally: shutil.rmtree(self.runsdir)
+    def sort(self, data):
+        return data.sort_values(self.by, ascending=self.ascending, 
+                                kind='stable')
+    def onchunkpath(self, chunkpath):
+        # sort chunk into a run of blocks ..........................
+        data    = self.sort(self.loadchunk(chunkpath))
+        runpath = os.path.join(self.runsdir, str(self.chunkranks[chunkpath]))
+        for start in range(0, len(data), self.blockrows):
+            pdmgr.dumpframe(data.iloc[start:start + self.blockrows], runpath)
+        return len(data)
+    def onoperated(self):
+        # refill chunks with merged rows ...........................
+        rows   = self.results  # chunks rows counts
+        frames, nrows, chunknum = [], 0, 0
+        for merged in self.mergeruns(rows):
+            frames.append(merged)
+            nrows += len(merged)
+            while chunknum < len(rows) and nrows >= rows[chunknum]:
+                data = pd.concat(frames) if len(frames) > 1 else frames[0]
+                self.dumpchunk(data.iloc[:rows[chunknum]], 
+                               self.chunkspaths[chunknum])
+                frames, nrows = [data.iloc[rows[chunknum]:]], nrows - rows[chunknum]
+                chunknum += 1
+    def mergeruns(self, rows):
+        "Yields sorted rows frames of runs (rows counts) k-way merged"
+        runs      = {run: pdmgr.loadframes(os.path.join(self.runsdir, str(run))) 
+                     for run, nrows in enumerate(rows) if nrows}
+        positions = np.zeros(len(rows), dtype=np.int64) # loaded rows
+        def loadblock(run):
+            "Returns run next block cursor [block, rowkey, position]"
+            block = next(runs[run])
+            rowkey = self.rowkeys(block, run, positions[run])
+            positions[run] += len(block)
+            return [block, rowkey, 0]
+        cursors = {run: loadblock(run) for run in runs}
+        heap    = [(cursor[1](0), run) for run, cursor in cursors.items()]
+        heapq.heapify(heap)
+        pieces, nrows = [], 0   # merged (block, start, stop) in order
+        while heap:
+            key, run = heapq.heappop(heap)
+            block, rowkey, start = cursors[run]
+            # run rows up to the least row of other runs at once
+            stop = len(block)
+            if heap:
+                low, stop, least = start + 1, len(block), heap[0][0]
+                while low < stop:
+                    middle = (low + stop) // 2
+                    if least < rowkey(middle): stop = middle
+                    else: low = middle + 1
+            pieces.append((block, start, stop))
+            nrows += stop - start
+            if stop < len(block): cursors[run][2] = stop
+            elif positions[run] < rows[run]: cursors[run] = loadblock(run)
+            else: del cursors[run]
+            if run in cursors: 
+                heapq.heappush(heap, (cursors[run][1](cursors[run][2]), run))
+            if nrows >= self.blockrows * len(runs): 
+                yield self.joinpieces(pieces)
+                pieces, nrows = [], 0
+        if pieces: yield self.joinpieces(pieces)
+    def rowkeys(self, block, run, offset):
+        """
+        Returns rowkey(position) of block (run rows from offset on) 
+        rows merge order keys: by keys (nulls last, as sort_values), 
+        then run and position for ties.
+        """
+        columns = [(block[key].tolist(), block[key].isna().tolist(), ascending)
+                   for key, ascending in zip(self.by, self.ascending)]
+        def rowkey(position):
+            key = []
+            for values, nulls, ascending in columns:
+                if nulls[position]: key.extend((1, 0))
+                elif ascending:     key.extend((0, values[position]))
+                else:               key.extend((0, Descending(values[position])))
+            key.extend((run, offset + position))
+            return tuple(key)
+        return rowkey
+    def joinpieces(self, pieces):
+        "Returns rows of (block, start, stop) pieces, in pieces order"
+        spans = {}   # id(block): [block, start, stop], pieces are contiguous
+        for block, start, stop in pieces:
+            spans.setdefault(id(block), [block, start, stop])[2] = stop
+        frames, offsets, offset = [], {}, 0
+        for key, (block, start, stop) in spans.items():
+            frames.append(block.iloc[start:stop])
+            offsets[key] = offset - start
+            offset      += stop - start
+        merged = pd.concat(frames) if len(frames) > 1 else frames[0]
+        if self.verbosity > 1: print('\t', 'merged rows:', '[',len(merged),']')
+        return merged.take(np.concatenate([np.arange(start, stop) + 
+                                           offsets[id(block)] 
+                                           for block, start, stop in pieces]))
+
+class MergePd(Chunks):
+    """
+    pandas merge emulation for two data chunks directories (partitioned 
+    hash join). Chunks rows of both sides are scattered into buckets 
+    files by hashes of their join keys (in workers if passed), thus 
+    equal keys share a bucket. Then every bucket of the left side is 
+    merged with the same bucket of the right side into a chunk of 
+    chunksdir (in workers if passed).
+        - constructor args:
+            + on, left_on, right_on, how, suffixes: as pd.merge 
+              (how is 'inner', 'left', 'right' or 'outer', on or 
+              left_on and right_on required, keys hash the buckets)
+            + nbuckets: number of hash buckets (a bucket pair fits in 
+                        memory)
+        - operate args: 
+            + leftdir:   left hierarchical directory of data chunks 
+            + rightdir:  right hierarchical directory of data chunks 
+            + chunksdir: directory of merged chunks, a chunk per bucket
+            + opath:     output file path to join merged chunks
+            + clean:     removes chunksdir recursively if True
+            + workers:   number of processes operating on chunks
+
+    Merged rows are in buckets order, not pd.merge order. Chunks IO by 
+    loadchunk and dumpchunk methods (see codec), merged chunks are 
+    pickled by default.
+    """
+    operation = 'merging ...'
+    codec     = 'pickle'
+    def __init__(self, on=None, *, how='inner', left_on=None, right_on=None,
+                       suffixes=('_x', '_y'), nbuckets=16, verbosity=False):
+        if how not in ('inner', 'left', 'right', 'outer'): 
+            raise ValueError('how %r is not a keys join' % how)
+        if on is None and (left_on is None or right_on is None):
+            raise ValueError('on or left_on/right_on required')
+        self.how      = how
+        self.keys     = {'left':  pdmgr.keycolumns(None, left_on or on), 
+                         'right': pdmgr.keycolumns(None, right_on or on)}
+        self.on       = on
+        self.left_on  = left_on
+        self.right_on = right_on
+        self.suffixes = suffixes
+        self.nbuckets = nbuckets
+        self.schemas  = set() # sides schemas dumped by this process
+        Chunks.__init__(self, verbosity=verbosity)
+    def operate(self, leftdir, rightdir, chunksdir, opath=None, clean=False, 
+                      workers=None):
+        # buckets next to chunksdir, not collected as chunks
+        os.mkdir(chunksdir)
+        self.writecodec(chunksdir)
+        self.bucketsdir = chunksdir.rstrip(os.sep) + '-buckets'
+        self.schemas    = set()
+        os.mkdir(self.bucketsdir)
+        try:
+            # scatter sides chunks into buckets ...................
+            for self.side, sidedir in ('left', leftdir), ('right', rightdir):
+                Chunks.operate(self, sidedir, workers=workers)
+            # merge buckets pairs into chunks .....................
+            if self.verbosity: print(self.operation)
+            chunkname   = chunksdir.rstrip(os.sep).split(os.sep)[-1]
+            chunkname   = chunkname + '-%0' + str(len(str(self.nbuckets))) + 'd'
+            chunkspaths = [os.path.join(chunksdir, chunkname % bucket) 
+                           for bucket in range(self.nbuckets)]
+            self.results = []
+            self.runchunks('onbucket', enumerate(chunkspaths), workers)
+        finally: shutil.rmtree(self.bucketsdir)
+        # merged chunks, empty buckets pairs aren't dumped
+        chunkspaths = [chunkpath for chunkpath, rows 
+                       in zip(chunkspaths, self.results) if rows]
+        self.chunksdir, self.chunkspaths = chunksdir, chunkspaths
+        for chunkpath in chunkspaths:
+            if not self.chunkentry(chunkpath): self.recordchunk(chunkpath)
+        self.writemanifests()
+        if self.verbosity: print('=> merged     : %s rows' % sum(self.results))
+
+        if opath: self.joinchunks(chunkspaths, opath, workers)
+
+        if clean: self.clean(chunksdir, workers)
+
+        if self.verbosity: print('done!\n\n')
+    def onchunkpath(self, chunkpath):
+        # scatter chunk rows into side buckets .....................
+        data     = self.loadchunk(chunkpath)
+        sidepath = os.path.join(self.bucketsdir, self.side)
+        # side columns for buckets missing the side (ie. outer)
+        if self.side not in self.schemas:
+            os.makedirs(os.path.join(sidepath, 'schema'), exist_ok=True)
+            pdmgr.dumpframe(data.iloc[:0], os.path.join(sidepath, 'schema', 
+                                                        processname()))
+            self.schemas.add(self.side)
+        # a bucket file per process (and host), no appends race in workers
+        for bucket, rows in pdmgr.hash_buckets(data, self.nbuckets, 
+                                               self.keys[self.side]):
+            bucketpath = os.path.join(sidepath, str(bucket))
+            os.makedirs(bucketpath, exist_ok=True)
+            pdmgr.dumpframe(rows, os.path.join(bucketpath, processname()))
+    def loadbucket(self, side, bucket):
+        "Returns side bucket rows (None if empty)"
+        bucketpath = os.path.join(self.bucketsdir, side, str(bucket))
+        if not os.path.isdir(bucketpath): return None
+        return pd.concat([frame for filename in sorted(os.listdir(bucketpath))
+                          for frame in pdmgr.loadframes(
+                                       os.path.join(bucketpath, filename))])
+    def loadschema(self, side):
+        "Returns side empty frame (columns and dtypes)"
+        schemapath = os.path.join(self.bucketsdir, side, 'schema')
+        if not os.path.isdir(schemapath): 
+            return pd.DataFrame(columns=self.keys[side])
+        filename = os.listdir(schemapath)[0]
+        return next(pdmgr.loadframes(os.path.join(schemapath, filename)))
+    def onbucket(self, bucket, chunkpath):
+        # merge bucket pair into chunk, returns its rows ...........
+        if self.verbosity > 1: print('\t', 'bucket:', '[',bucket,']')
+        left, right = self.loadbucket('left', bucket), self.loadbucket('right', 
+                                                                       bucket)
+        if left is None and right is None: return 0
+        if left is None:
+            if self.how in ('inner', 'left'): return 0
+            left = self.loadschema('left')
+        if right is None:
+            if self.how in ('inner', 'right'): return 0
+            right = self.loadschema('right')
+        data = pd.merge(left, right, how=self.how, on=self.on, 
+                        left_on=self.left_on, right_on=self.right_on, 
+                        suffixes=self.suffixes)
+        if data.empty: return 0
+        self.dumpchunk(data, chunkpath)
+        return len(data)
+
+class Step(collections.namedtuple('Step', 'kind args uses')):
+    """
+    A QueryPd plan step, kind (ie. 'filter'), its args and uses, the 
+    columns names (frozenset) it reads, None if unknown (all columns).
+    """
+    # rows wise steps, a filter can run before them (see QueryPd.plan)
+    def rowwise(self):
+        if self.kind == 'select': return True
+        if self.kind != 'assign': return False
+        return all(not callable(expr) for name, expr in self.args)
+
+class QueryPd:
+    """
+    Lazy pandas query of a huge data file or a data chunks directory. 
+    Steps (filter, select, assign, dropna, map and aggregate) are only 
+    recorded, every step returns a new query thus queries are chained 
+    and reused. run operates the planned steps (see plan) fused into a 
+    single per chunk pipeline (PipelinePd of a file, PipelineChunksPd 
+    of a chunks directory) in one pass, instead of an operation (chunks 
+    dumped and loaded) per step.
+        - constructor args:
+            + source: data file path, or chunks directory if reader 
+                      is None
+            + reader: PandasIO reader (ie. 'read_json', 'read_csv')
+            + kwargs: reader args (ie. lines, chunksize, mb, ranges), 
+                      chunksize in MB (mb=True) but of read_bson
+
+    Expressions strings (filter and assign) are evaluated by 
+    DataFrame.eval on chunks columns, their columns are read from them 
+    (see _pdmgr.exprcolumns). Callables take a chunk (frame), pass 
+    uses (columns names) they read or columns aren't projected.
+    """
+    # readers projection args, others chunks are projected once parsed
+    projections = {'read_csv':  lambda columns: frozenset(columns).__contains__,
+                   'read_bson': sorted,}
+    def __init__(self, source, reader='read_json', steps=(), **kwargs):
+        # rows chunksize returns a pandas reader, not chunks
+        if (kwargs.get('chunksize') and reader not in (None, 'read_bson') and 
+            not (kwargs.get('mb') or kwargs.get('budget'))):
+            raise ValueError('chunksize requires mb=True (chunks in MB)')
+        self.source = source
+        self.reader = reader
+        self.kwargs = kwargs
+        self.steps  = tuple(steps)
+
+    def step(self, kind, args, uses):
+        "Returns a new query with a kind step appended"
+        if self.steps and self.steps[-1].kind == 'aggregate':
+            raise ValueError("can't %s an aggregated query" % kind)
+        uses = None if uses is None else frozenset(uses)
+        return QueryPd(self.source, self.reader, 
+                       self.steps + (Step(kind, args, uses),), **self.kwargs)
+
+    def filter(self, predicate, uses=None):
+        "keeps rows where predicate (expression or callable) is True"
+        if isinstance(predicate, str): uses = pdmgr.exprcolumns(predicate)
+        return self.step('filter', [predicate], uses)
+
+    def select(self, *columns):
+        "keeps columns (labels or a list) in order"
+        if len(columns) == 1 and pd.api.types.is_list_like(columns[0]):
+            columns = columns[0]
+        return self.step('select', list(columns), columns)
+
+    def assign(self, uses=None, **exprs):
+        "assigns columns of expressions, callables or values (pd.assign)"
+        names = set(uses or ())
+        for expr in exprs.values():
+            if isinstance(expr, str): names |= pdmgr.exprcolumns(expr)
+            elif callable(expr) and uses is None: 
+                names = None
+                break
+        return self.step('assign', list(exprs.items()), names)
+
+    def dropna(self, subset=None, how='any'):
+        "drops rows with nulls (on subset columns), see pd.dropna"
+        uses = None if subset is None else pdmgr.keycolumns(None, subset)
+        return self.step('dropna', {'subset': uses, 'how': how}, uses)
+
+    def map(self, func, uses=None):
+        "replaces chunks by func (frame to frame) return values"
+        return self.step('map', func, uses)
+
+    def aggregate(self, by, spec, ddof=1):
+        "aggregates rows (final step), see AggregateMixin"
+        pdmgr.aggspec(spec) # fail early
+        uses = [] if by is None else pdmgr.keycolumns(None, by)
+        return self.step('aggregate', (by, spec, ddof), 
+                         list(uses) + list(spec))
+
+    def plan(self):
+        """
+        Returns (columns, steps) optimized plan, the columns names the 
+        steps read (None if all) projected by the reader and steps 
+        fused: filters run before rows wise selects keeping their 
+        columns and assigns not assigning them, adjacent filters are a 
+        single mask, adjacent assigns a single step and adjacent 
+        selects the last.
+        """
+        steps = []
+        for step in self.steps:
+            position = len(steps)
+            if step.kind == 'filter' and step.uses is not None:
+                while position and steps[position - 1].rowwise():
+                    before = steps[position - 1]
+                    if (before.kind == 'assign' and 
+                        step.uses & {name for name, expr in before.args}): 
+                        break
+                    # a filter of dropped columns fails after the select
+                    if (before.kind == 'select' and 
+                        not step.uses <= set(before.args)): break
+                    position -= 1
+            steps.insert(position, step)
+        fused = []
+        for step in steps:
+            last = fused[-1] if fused else None
+            if not last or last.kind != step.kind or step.kind not in (
+                                          'filter', 'assign', 'select'):
+                fused.append(step)
+                continue
+            if step.kind == 'select': fused[-1] = step
+            else:
+                uses = (None if last.uses is None or step.uses is None 
+                        else last.uses | step.uses)
+                fused[-1] = Step(step.kind, last.args + step.args, uses)
+        # columns read, backwards from the last step
+        columns = None
+        for step in reversed(fused):
+            if step.kind in ('select', 'aggregate'): columns = set(step.uses)
+            elif columns is None: continue
+            elif step.uses is None: columns = None
+            elif step.kind == 'assign': 
+                columns = columns - {name for name, expr in step.args}
+                columns = columns | step.uses
+            else: columns = columns | step.uses
+        return columns, fused
+
+    def run(self, chunksdir, opath=None, clean=False, workers=None, *, 
+                  codec='pickle', verbosity=False):
+        """
+        Returns the operated pipeline (PipelinePd or PipelineChunksPd), 
+        query chunks are dumped into chunksdir by codec and joined 
+        into opath if passed, aggregated queries results are in its 
+        aggregated attribute (opath is ignored).
+        """
+        columns, steps = self.plan()
+        if steps and steps[-1].kind == 'aggregate': opath = None
+        if self.reader is None:
+            pipeline = PipelineChunksPd(steps, columns, codec=codec, 
+                                        verbosity=verbosity)
+            pipeline.operate(self.source, chunksdir, opath, clean, workers)
+            return pipeline
+        kwargs = dict(self.kwargs)
+        # reader projection, unless usecols passed
+        if (columns is not None and self.reader in self.projections and 
+            kwargs.get('usecols') is None):
+            kwargs['usecols'] = self.projections[self.reader](columns)
+            columns = None      # projected by the reader
+        data = getattr(PandasIO(verbosity=verbosity), self.reader)(
+                                                      self.source, **kwargs)
+        nchunks = None
+        if isinstance(data, tuple): data, nchunks = data[:2]
+        pipeline = PipelinePd(steps, columns, codec=codec, verbosity=verbosity)
+        pipeline.operate(data, chunksdir, nchunks, opath, clean, workers)
+        return pipeline
+
+class PipelineMixin:
+    """
+    Fused steps (see QueryPd.plan) pipeline interface mixin of BigData 
+    and Chunks, see PipelinePd and PipelineChunksPd. Every chunk is 
+    projected on columns (if not None) and runs through steps once. 
+    Chunks of an aggregate step return partials to self.results, 
+    combined into self.aggregated, else rows counts.
+        - constructor args:
+            + steps:   QueryPd plan steps
+            + columns: columns names projected, None if all
+            + codec:   query chunks codec
+    """
+    operation = 'querying ...'
+    def __init__(self, steps, columns=None, *, codec='pickle', 
+                       verbosity=False):
+        self.steps, self.columns, self.codec = steps, columns, codec
+        self.aggregated = None
+        super().__init__(verbosity=verbosity)
+    def pipeline(self, data):
+        "Returns data chunk run through steps"
+        data = pdmgr.project(data, self.columns)
+        for kind, args, uses in self.steps:
+            if kind == 'filter':
+                mask = np.ones(len(data), dtype=bool)
+                for predicate in args:
+                    if isinstance(predicate, str): 
+                        mask &= data.eval(predicate).to_numpy(bool)
+                    else: mask &= np.asarray(predicate(data), dtype=bool)
+                data = data[mask]
+            elif kind == 'select': data = data[args]
+            elif kind == 'assign':
+                data = data.copy()
+                for name, expr in args:
+                    if isinstance(expr, str): expr = data.eval(expr)
+                    elif callable(expr):      expr = expr(data)
+                    data[name] = expr
+            elif kind == 'dropna': data = data.dropna(**args)
+            elif kind == 'map':    data = args(data)
+            else: 
+                by, spec, ddof = args
+                return pdmgr.partials(data, by, spec)
+        return data
+    def onquery(self, data, chunkpath):
+        "Returns data chunk results, query chunk dumped to chunkpath"
+        data = self.pipeline(data)
+        if self.aggregates(): return data
+        self.dumpchunk(data, chunkpath)
+        return len(data)
+    def aggregates(self): 
+        return bool(self.steps) and self.steps[-1].kind == 'aggregate'
+    def onoperated(self):
+        if not self.aggregates(): return
+        by, spec, ddof  = self.steps[-1].args
+        self.aggregated = pdmgr.finalize(pdmgr.combine(self.results), spec, 
+                                         ddof)
+
+class PipelinePd(PipelineMixin, BigData):
+    """
+    Query pipeline of parsed data chunks in one pass, see 
+    PipelineMixin. Query chunks are dumped into chunksdir, aggregated 
+    queries dump nothing (chunksdir is still made, clean it).
+    """
+    def onchunkdata(self, data, chunkpath): return self.onquery(data, 
+                                                                chunkpath)
+
+class PipelineChunksPd(PipelineMixin, Chunks):
+    """
+    Query pipeline of a data chunks directory in one pass, see 
+    PipelineMixin. Chunks are loaded on columns (see loadchunk), query 
+    chunks are dumped into chunksdir in chunks order (not in-place).
+        - operate args: 
+            + sourcedir: hierarchical directory of data chunks 
+            + chunksdir: directory of query chunks, a chunk per chunk
+            + opath:     output file path to join query chunks
+            + clean:     removes chunksdir recursively if True
+            + workers:   number of processes operating on chunks
+    """
+    def operate(self, sourcedir, chunksdir, opath=None, clean=False, 
+                      workers=None):
+        os.mkdir(chunksdir)
+        self.writecodec(chunksdir)
+        self.querydir = chunksdir
+        Chunks.operate(self, sourcedir, workers=workers)
+        chunkspaths = [self.querypath(chunkpath) 
+                       for chunkpath in self.chunkspaths]
+        chunkspaths = chunkspaths[:len(self.results)]
+        if self.aggregates(): chunkspaths = []
+        self.chunksdir, self.chunkspaths = chunksdir, chunkspaths
+        # manifest query chunks dumped in workers
+        for chunkpath in chunkspaths:
+            if not self.chunkentry(chunkpath): self.recordchunk(chunkpath)
+        self.writemanifests()
+
+        if opath: self.joinchunks(chunkspaths, opath, workers)
+
+        if clean: self.clean(chunksdir, workers)
+
+        if self.verbosity: print('done!\n\n')
+    def querypath(self, chunkpath):
+        "Returns chunkpath query chunk path, numbered by chunks order"
+        chunkname = self.querydir.rstrip(os.sep).split(os.sep)[-1]
+        chunkname = chunkname + '-%0' + str(len(str(len(self.chunkspaths))))
+        chunkname = (chunkname + 'd') % (self.chunkranks[chunkpath] + 1)
+        return os.path.join(self.querydir, chunkname)
+    def onchunkpath(self, chunkpath):
+        data = self.loadchunk(chunkpath, self.columns)
+        return self.onquery(data, self.querypath(chunkpath))
 
 # unittests
 # tests this module's logicic
@@ -365,6 +2692,19 @@ if __name__ == '__main__':
     import unittest
     import subprocess
     import pandas as pd, numpy as np
+    import multiprocessing
+
+    # cluster operations, pickled to workers by reference (module level)
+    class ClusterRows(Chunks):
+        "chunks rows, the second chunk kills its first worker if killed"
+        killed      = None   # marker file path
+        keepmetrics = True
+        def onchunkpath(self, chunkpath):
+            if (self.killed and chunkpath == self.chunkspaths[1] and 
+                not os.path.exists(self.killed)):
+                open(self.killed, 'w').close()
+                os._exit(1)
+            return len(self.loadchunk(chunkpath))
     
     class BigDataLogicTest(unittest.TestCase):
         # set testing 
@@ -440,6 +2780,22 @@ if __name__ == '__main__':
             # remember chunker
             self.ChunkItUp = ChunkItUp
 
+            # define pickle chunker (ranges) for reuse
+            class PickleItUp(BigData):
+                codec = 'pickle'
+                def init(test):
+                    pdIO = PandasIO()
+                    data, nchunks, nlines = pdIO.read_json(self.origjson, 
+                                                           lines=True,
+                                                           mb=True, 
+                                                           ranges=True,
+                                                           chunksize=self.mb)
+                    test.operate(data, 'pickles', nchunks)
+                def onchunkdata(test, data, chunkpath):
+                    test.dumpchunk(data, chunkpath)
+            # remember chunker
+            self.PickleItUp = PickleItUp
+
         # clean testing environment 
         def tearDown(self):
             try:
@@ -522,6 +2878,7 @@ if __name__ == '__main__':
         def test_parallelization(self):
             # define parallelizer
             class Parallelize(Drop_DuplicatesPd):
+                workers = None
                 def init(test):
                     # output file
                     ofile = 'test.out'
@@ -530,7 +2887,7 @@ if __name__ == '__main__':
                     self.ChunkItUp(verbosity=True)
 
                     # drop duplicates in parallel
-                    test.operate(self.chunksdir, ofile, True)
+                    test.operate(self.chunksdir, ofile, True, test.workers)
 
                     # define in-memory loader 
                     class LoadAll(BigData):
@@ -542,6 +2899,9 @@ if __name__ == '__main__':
 
                     # assert values      (original,      operated)
                     self.assertCountEqual(self.origdata, unique)
+                    origdata = pd.read_json(self.origjson, lines=True)
+                    origdata = origdata.drop_duplicates(ignore_index=True)
+                    self.assertTrue(origdata.equals(unique))
                 
                 ##################################################
                 # adhere to parallel protocol ...
@@ -566,4 +2926,852 @@ if __name__ == '__main__':
                                                             orient='records')
             # run test
             Parallelize(verbosity=1)
+
+            # test pairs rounds in workers processes
+            pairs = set()
+            for pairs_ in roundrobin(range(7)):
+                items = [item for pair in pairs_ for item in pair]
+                self.assertEqual(len(items), len(set(items)))
+                pairs.update(frozenset(pair) for pair in pairs_)
+            self.assertEqual(len(pairs), 7 * 6 / 2)
+            Parallelize.workers = 2
+            Parallelize(verbosity=2)
+
+        # test pdmgr.duplicated against concatenated frames
+        def test_hash_index(self):
+            frames = []
+            for seed in range(2):
+                rng = np.random.default_rng(seed)
+                frames.append(pd.DataFrame({
+                    'a': rng.integers(0, 3, 40),
+                    'b': rng.choice([0.0, -0.0, 1.5, np.nan], 40),
+                    'c': rng.choice(['x', 'y', None], 40),}))
+            df1, df2 = frames
+            df2['a'] = df2['a'].astype(float)  # ie. chunk with nulls
+            # hashes collisions are verified
+            class Colliding(pdmgr.HashIndex):
+                def hashes(test, df): return np.zeros(len(df), dtype='uint64')
+            for index in None, Colliding(df1), Colliding(df1, 'b'):
+                subset = index and index.subset
+                for keep in 'first', 'last', False:
+                    dup1, dup2 = pdmgr.duplicated(df1, df2, subset, keep, 
+                                                  index)
+                    dup = pd.concat([df1, df2], 
+                                    keys=['df1', 'df2']).duplicated(subset, 
+                                                                   keep=keep)
+                    self.assertTrue(dup1.equals(dup.loc['df1']))
+                    self.assertTrue(dup2.equals(dup.loc['df2']))
+            # deduplicated df2 rows in df1
+            df2 = df2.drop_duplicates()
+            self.assertEqual(list(pdmgr.HashIndex(df1).isin(df2)), 
+                             list(pdmgr.duplicated(df1, df2)[1]))
+
+        # test Drop_DuplicatesHashPd
+        def test_hash_drop_duplicates(self):
+            # define hash deduplicator
+            class HashDedup(Drop_DuplicatesHashPd):
+                def init(test):
+                    # output file
+                    ofile = 'test.out'
+
+                    # chunk initial shufled duplicated data file
+                    self.ChunkItUp(verbosity=True)
+
+                    # drop duplicates in buckets
+                    test.operate(self.chunksdir, ofile, True)
+
+                    # assert values, order kept (original, operated)
+                    unique = pd.read_json(self.origjson, lines=True)
+                    unique = unique.drop_duplicates(ignore_index=True)
+                    self.assertTrue(unique.equals(pd.read_json(ofile, 
+                                                               lines=True)))
+                    self.assertFalse(os.path.exists(test.bucketsdir))
+
+                # adhere to chunks protocol
+                def loadchunk(test, chunkpath):
+                    return pd.read_json(chunkpath, lines=True)
+                def dumpchunk(test, data, chunkpath):
+                    data.to_json(chunkpath, lines=True, orient='records')
+            # run test
+            HashDedup(4, verbosity=2)
+
+        # test SortPd
+        def test_sort(self):
+            chunker  = self.PickleItUp()
+            origdata = pd.concat([chunker.loadchunk(chunkpath) 
+                                  for chunkpath in chunker.chunkspaths])
+            rows     = [len(chunker.loadchunk(chunkpath)) 
+                        for chunkpath in chunker.chunkspaths]
+            by       = list(origdata.columns[:2])
+            # define sorter, blocks smaller than chunks
+            class Sort(SortPd):
+                def init(test):
+                    test.operate('pickles', 'sorted.json', workers=2)
+            sorter = Sort(by, ascending=[False, True], blockrows=1000)
+            # assert values in chunks and joined opath
+            data   = pd.concat([sorter.loadchunk(chunkpath) 
+                                for chunkpath in sorter.chunkspaths])
+            self.assertTrue(data.equals(origdata.sort_values(by, 
+                                                ascending=[False, True])))
+            self.assertEqual(rows, [len(sorter.loadchunk(chunkpath)) 
+                                    for chunkpath in sorter.chunkspaths])
+            self.assertEqual(len(pd.read_json('sorted.json', lines=True)), 
+                             len(data))
+            self.assertFalse(os.path.exists(sorter.runsdir))
+            # ties and nulls as a stable sort
+            frames = []
+            for chunkpath in sorter.chunkspaths:
+                data = sorter.loadchunk(chunkpath)
+                data[by[0]] = data[by[0]].round().where(data[by[1]] > 0)
+                sorter.dumpchunk(data, chunkpath)
+                frames.append(data)
+            origdata = pd.concat(frames)
+            sorter   = Sort(by[0], ascending=False, blockrows=700)
+            data     = pd.concat([sorter.loadchunk(chunkpath) 
+                                  for chunkpath in sorter.chunkspaths])
+            self.assertTrue(data.equals(origdata.sort_values(by[0], 
+                                        ascending=False, kind='stable')))
+
+        # test MergePd
+        def test_merge(self):
+            chunker = self.PickleItUp()
+            left    = pd.concat([chunker.loadchunk(chunkpath) 
+                                 for chunkpath in chunker.chunkspaths])
+            key     = left.columns[0]
+            right   = pd.DataFrame({key: left[key].iloc[::7].to_numpy(), 
+                                    'right': np.arange(len(left[::7]))})
+            right   = pd.concat([right, right.iloc[:10]]) # many to many
+            # define right side chunker
+            class ChunkRight(BigData):
+                codec = 'pickle'
+                def init(test):
+                    test.operate([right.iloc[start:start + 500] for start 
+                                  in range(0, len(right), 500)], 'right')
+                def onchunkdata(test, data, chunkpath):
+                    test.dumpchunk(data, chunkpath)
+            ChunkRight()
+            rightfiles = sorted(os.listdir('right'))
+            self.assertRaises(ValueError, MergePd, nbuckets=5)
+            # assert values by how (buckets order)
+            for how, workers in ('inner', 2), ('outer', None):
+                merger = MergePd(key, how=how, nbuckets=5)
+                merger.operate('pickles', 'right', how, how + '.json', 
+                               workers=workers)
+                merged = pd.concat([merger.loadchunk(chunkpath) 
+                                    for chunkpath in merger.chunkspaths])
+                merged = merged.sort_values(list(merged.columns), 
+                                            ignore_index=True)
+                expected = pd.merge(left, right, how=how, on=key)
+                expected = expected.sort_values(list(merged.columns), 
+                                                ignore_index=True)
+                self.assertTrue(merged.equals(expected))
+                self.assertEqual(sum(merger.results), len(expected))
+                self.assertFalse(os.path.exists(merger.bucketsdir))
+                # inputs aren't written (no checkpoints)
+                self.assertEqual(sorted(os.listdir('right')), rightfiles)
+
+        # test AggregatePd and AggregateChunksPd
+        def test_aggregate(self):
+            origdata = pd.read_json(self.origjson, lines=True)
+            key      = origdata.columns[0]
+            origdata[key] = (origdata[key] > 0) # groups keys
+            spec     = {origdata.columns[1]: ['count', 'mean', 'var'], 
+                        origdata.columns[2]: ['min', 'max', 'sum', 'std']}
+            expected = origdata.groupby(key).agg(spec)
+            # define parsed chunks aggregation
+            class Aggregate(AggregatePd):
+                def init(test):
+                    pdIO = PandasIO()
+                    data, nchunks, nlines = pdIO.read_json(self.origjson, 
+                                                           lines=True,
+                                                           mb=True, 
+                                                           chunksize=self.mb)
+                    test.operate(data, 'temp', nchunks, clean=True)
+                def aggregate(test, data):
+                    data[key] = data[key] > 0
+                    return AggregatePd.aggregate(test, data)
+            # define chunks aggregation in workers
+            class AggregateChunks(AggregateChunksPd):
+                def init(test): test.operate('pickles', workers=2)
+                def aggregate(test, data):
+                    data[key] = data[key] > 0
+                    return AggregateChunksPd.aggregate(test, data)
+            self.PickleItUp()
+            for aggregator in Aggregate, AggregateChunks:
+                aggregated = aggregator(key, spec).aggregated
+                self.assertTrue(aggregated.index.equals(expected.index))
+                self.assertEqual(list(aggregated.columns), 
+                                 list(expected.columns))
+                self.assertTrue(np.allclose(aggregated.to_numpy(float), 
+                                            expected.to_numpy(float)))
+
+        # test _jsonmgr docs frames
+        def test_json_docs(self):
+            docs = pd.Series([{'a': 1, 'b': 'x'}, np.nan, 
+                              {'a': 2, 'c': {'d': 3}}])
+            frame = json.to_frame(docs)
+            self.assertEqual(list(frame.index), [0, 2])
+            self.assertEqual(list(frame['a']), [1, 2])
+            self.assertEqual(frame['c'][2], {'d': 3})
+            self.assertEqual(list(json.to_frame(docs, usecols=['b']).columns), 
+                             ['b'])
+            self.assertEqual(json.to_frame(docs, normalize=True)['c.d'][2], 3)
+            # nested docs as chunk stage
+            class Nested(BigData):
+                def init(test):
+                    test.operate([pd.DataFrame({'doc': [[1, 'x'], [2], None]})], 
+                                 'temp', clean=True)
+                def onchunkdata(test, data, chunkpath):
+                    return json.to_frame(data['doc'], ['n', 's'])
+            frame = Nested().results[0]
+            self.assertEqual(list(frame.columns), ['n', 's'])
+            self.assertEqual(list(frame['n'].iloc[:2]), [1, 2])
+            self.assertTrue(frame.iloc[2].isna().all())
+            self.assertEqual(list(json.to_values(docs, 'a').dropna()), [1, 2])
+            self.assertEqual(list(json.to_values(docs, 'b').isna()), 
+                             [False, True, True])
+            # dicts docs keys renamed to columns
+            keyed = json.to_frame(pd.Series([{'a': 1, 'b': 'x'}, 
+                                             {'a': 2, 'b': 'y'}]), ['A', 'B'])
+            self.assertEqual(keyed.to_dict('list'), {'A': [1, 2], 
+                                                     'B': ['x', 'y']})
+
+        # test BsonReader
+        def test_bson(self):
+            import struct
+            # minimal BSON encoder of int, float, str and docs values
+            def encode(doc):
+                elements = b''
+                for key, value in doc.items():
+                    if   isinstance(value, dict):  btype, value = 3, encode(value)
+                    elif isinstance(value, int):   btype, value = 0x12, struct.pack('<q', value)
+                    elif isinstance(value, float): btype, value = 1, struct.pack('<d', value)
+                    else:
+                        value = value.encode() + b'\x00'
+                        btype, value = 2, struct.pack('<i', len(value)) + value
+                    elements += bytes([btype]) + key.encode() + b'\x00' + value
+                return struct.pack('<i', len(elements) + 5) + elements + b'\x00'
+            docs = [{'i': num, 'f': num / 3, 's': 'doc%s' % num, 
+                     'sub': {'j': -num}} for num in range(1000)]
+            with open('test.bson', 'wb') as file: 
+                file.write(b''.join(map(encode, docs)))
+            # native decoding
+            with open('test.bson', 'rb') as file: data = file.read()
+            decoded, pos = [], 0
+            while pos < len(data):
+                doc, pos = json.decode_document(data, pos)
+                decoded.append(doc)
+            self.assertEqual(decoded, docs)
+            self.assertEqual(json.bson_decode(data), docs)
+            # define bson chunker, (serial, workers)
+            class ChunkBson(BigData):
+                def init(test):
+                    pdIO = PandasIO(verbosity=True)
+                    data, nchunks, nlines = pdIO.read_bson('test.bson', 
+                                                           chunksize=300, 
+                                                           usecols=['i', 'sub'])
+                    self.assertEqual(nchunks, 4)
+                    test.operate(data, test.chunksdir, nchunks, 
+                                 workers=test.workers)
+                def onchunkdata(test, data, chunkpath): return data
+            for chunksdir, workers in ('serial', None), ('workers', 2):
+                ChunkBson.chunksdir, ChunkBson.workers = chunksdir, workers
+                frame = pd.concat(ChunkBson().results, ignore_index=True)
+                self.assertEqual(list(frame.columns), ['i', 'sub'])
+                self.assertEqual(list(frame['i']), list(range(1000)))
+                self.assertEqual(frame['sub'][999], {'j': -999})
+            ranges = json.bson_ranges('test.bson', mb=0.01)
+            self.assertEqual([start for start, end in ranges[1:]], 
+                             [end for start, end in ranges[:-1]])
+            self.assertEqual(ranges[-1][-1], len(data))
+            self.assertTrue(all(end - start >= 10 ** 4 
+                                for start, end in ranges[:-1]))
+
+        # test BudgetReader
+        def test_budget(self):
+            origdata = pd.read_json(self.origjson, lines=True)
+            # define budget chunker
+            class ChunkBudget(BigData):
+                def init(test):
+                    pdIO = PandasIO(verbosity=True)
+                    test.data, nchunks, nlines = pdIO.read_json(self.origjson, 
+                                                           lines=True, 
+                                                           budget=self.mb, 
+                                                           downcast=True)
+                    test.operate(test.data, 'budget', nchunks, 'budget.out')
+                def onchunkdata(test, data, chunkpath):
+                    data.to_json(chunkpath, lines=True, orient='records')
+            reader = ChunkBudget().data
+            sizes  = reader.report()
+            self.assertEqual(sizes['rows'].sum(), len(origdata))
+            self.assertTrue((sizes['memory'] <= sizes['parsed']).all())
+            # later chunks resized to budget
+            self.assertTrue((sizes['parsed'][1:-1] <= self.mb * 10 ** 6).all())
+            self.assertTrue((sizes['parsed'][1:-1] >= self.mb * 10 ** 6 / 2).all())
+            self.assertTrue(pd.read_json('budget.out', lines=True).equals(origdata))
+
+        # test chunks compressions
+        def test_compression(self):
+            import gzip
+            origdata = pd.read_json(self.origjson, lines=True)
+            # define compressed chunker, (codec, compression)
+            class ChunkCompressed(BigData):
+                def init(test):
+                    pdIO = PandasIO()
+                    data, nchunks, nlines = pdIO.read_json(self.origjson, 
+                                                           lines=True,
+                                                           mb=True, 
+                                                           ranges=True,
+                                                           chunksize=self.mb)
+                    test.operate(data, test.compression, nchunks, 
+                                 workers=2)
+                def onchunkdata(test, data, chunkpath):
+                    test.dumpchunk(data, chunkpath)
+            for codec, compression in ('json', 'gzip'), ('pickle', 'bz2'):
+                ChunkCompressed.codec       = codec
+                ChunkCompressed.compression = compression
+                chunker = ChunkCompressed()
+                # loaded transparently, joined decompressed
+                class Join(Chunks):
+                    def init(test):
+                        test.operate(compression, compression + '.json')
+                        test.operate(compression, compression + '.json.gz')
+                    def onchunkpath(test, chunkpath):
+                        return test.loadchunk(chunkpath)
+                joiner = Join()
+                loaded = pd.concat(joiner.results[:len(chunker.chunkspaths)], 
+                                   ignore_index=True)
+                self.assertTrue(loaded.equals(origdata))
+                with open(compression + '.json', 'rb') as file: text = file.read()
+                with gzip.open(compression + '.json.gz') as file: 
+                    self.assertEqual(file.read(), text)
+                self.assertTrue(pd.read_json(io.BytesIO(text), 
+                                             lines=True).equals(origdata))
+            # gzip members copied as is
+            chunkspaths = Chunks().findchunks('gzip')
+            self.assertEqual(os.path.getsize('gzip.json.gz'), 
+                             sum(map(os.path.getsize, chunkspaths)))
+
+        # test sharded chunks directories
+        def test_fanout(self):
+            # define sharded chunker, chunks names not padded
+            class ChunkShards(BigData):
+                codec  = 'pickle'
+                fanout = 4
+                def init(test):
+                    pdIO = PandasIO()
+                    data, nchunks, nlines = pdIO.read_json(self.origjson, 
+                                                           lines=True,
+                                                           mb=True, 
+                                                           ranges=True,
+                                                           chunksize=self.mb)
+                    test.operate(data, 'shards')
+                def onchunkdata(test, data, chunkpath):
+                    test.dumpchunk(data, chunkpath)
+            chunker = ChunkShards()
+            self.assertGreater(len(chunker.chunkspaths), 10)
+            self.assertEqual(chunker.chunkspaths[9], 
+                             os.path.join('shards', '2', 'shards-10'))
+            self.assertEqual(len(os.listdir(os.path.join('shards', '0'))), 
+                             4 + 2) # codec and manifest files
+            # chunks order and pairs on shards
+            class Dedup(Drop_DuplicatesPd):
+                def init(test): 
+                    test.operate('shards', 'shards.json', True, workers=2)
+            deduper = Dedup()
+            self.assertEqual(deduper.chunkspaths, chunker.chunkspaths)
+            unique = pd.read_json(self.origjson, lines=True)
+            unique = unique.drop_duplicates(ignore_index=True)
+            self.assertTrue(unique.equals(pd.read_json('shards.json', 
+                                                       lines=True)))
+            self.assertFalse(os.path.exists('shards'))
+            self.assertEqual(sorted(['a-10', 'a-9', 'a-09b'], key=naturalkey), 
+                             ['a-9', 'a-09b', 'a-10'])
+
+        # test lazy queries, fused pipelines
+        def test_query(self):
+            origdata = pd.read_json(self.origjson, lines=True)
+            origdata.columns = ['c%s' % column for column in origdata]
+            origdata.to_csv('test.csv', index=False)
+            query = (QueryPd('test.csv', 'read_csv', mb=True, ranges=True, 
+                             chunksize=self.mb)
+                     .assign(s='c0 + c1').filter('c2 > 0')
+                     .filter(lambda data: data.c3 < 1, uses=['c3'])
+                     .select('c3', 's'))
+            columns, steps = query.plan()
+            self.assertEqual(columns, {'c0', 'c1', 'c2', 'c3'})
+            self.assertRaises(ValueError, QueryPd, 'test.csv', 'read_csv', 
+                              chunksize=100)
+            self.assertEqual([step.kind for step in steps], 
+                             ['filter', 'assign', 'select'])
+            expected = origdata.assign(s=origdata.c0 + origdata.c1)
+            expected = expected[(expected.c2 > 0) & (expected.c3 < 1)]
+            expected = expected[['c3', 's']].reset_index(drop=True)
+            pipeline = query.run('query', 'query.json', workers=2)
+            self.assertTrue(np.allclose(pd.read_json('query.json', lines=True), 
+                                        expected))
+            # chunks directory query, aggregated
+            query = (QueryPd('query', None).filter('s > 0')
+                     .assign(key=lambda data: data.c3 > 0, uses=['c3'])
+                     .aggregate('key', {'s': ['count', 'mean']}))
+            self.assertEqual(query.plan()[0], {'s', 'c3'})
+            aggregated = query.run('aggregated', clean=True).aggregated
+            expected   = expected[expected.s > 0]
+            expected   = expected.groupby(expected.c3 > 0).agg(
+                                          {'s': ['count', 'mean']})
+            self.assertTrue(np.allclose(aggregated, expected))
+            self.assertFalse(os.path.exists('aggregated'))
+            self.assertRaises(ValueError, query.select, 's')
+            # filters don't run before selects dropping their columns
+            steps = QueryPd('test.csv').select('c0', 'c1').filter('c2 > 0'
+                                                                  ).plan()[1]
+            self.assertEqual([step.kind for step in steps], 
+                             ['select', 'filter'])
+            os.remove('test.csv')
+
+        # test mergeable sketches, persisted
+        def test_sketches(self):
+            origdata = pd.read_json(self.origjson, lines=True)
+            origdata[1] = (origdata[1] * 4).round()  # few frequent values
+            class ChunkSketched(SketchPd):
+                codec = 'pickle'
+                def init(test):
+                    pdIO = PandasIO()
+                    data, nchunks, nlines = pdIO.read_json(self.origjson, 
+                                                           lines=True,
+                                                           mb=True, 
+                                                           ranges=True,
+                                                           chunksize=self.mb)
+                    test.operate(data, 'sketched', nchunks, workers=2)
+                def onchunkdata(test, data, chunkpath):
+                    data[1] = (data[1] * 4).round()
+                    test.dumpchunk(data, chunkpath)
+                    return SketchPd.onchunkdata(test, data, chunkpath)
+            class Sketch(SketchChunksPd):
+                def init(test): test.operate('sketched')
+                def loadchunk(test, chunkpath, columns=None):
+                    type(test).loaded += 1
+                    return SketchChunksPd.loadchunk(test, chunkpath, columns)
+            Sketch.loaded = 0
+            for sketcher in ChunkSketched([0, 1]), Sketch([0, 1]):
+                distinct = sketcher.sketches[0]['distinct'].count()
+                self.assertLess(abs(distinct / origdata[0].nunique() - 1), 0.05)
+                quantiles = sketcher.sketches[0]['quantiles']
+                for q in 0.1, 0.5, 0.9:
+                    rank = (origdata[0] <= quantiles.quantile(q)).mean()
+                    self.assertLess(abs(rank - q), 0.02)
+                counts  = origdata[1].value_counts()
+                hitters = sketcher.sketches[1]['frequent'].heavyhitters(0.05)
+                self.assertEqual(list(hitters), 
+                                 list(counts[counts >= 0.05 * len(origdata)]
+                                      .index))
+            # persisted sketches of unchanged chunks, no loading
+            self.assertEqual(Sketch.loaded, 0)
+            self.assertTrue(os.path.exists(os.path.join('sketched', 
+                                                        '.sketches')))
+            Sketch([0])
+            self.assertEqual(Sketch.loaded, len(Chunks().findchunks('sketched')))
+
+        # test block nested loop pairs, chunks cache
+        def test_block_loop(self):
+            self.PickleItUp()
+            shutil.copytree('pickles', 'blocks')
+            unique = pd.read_json(self.origjson, lines=True)
+            unique = unique.drop_duplicates(ignore_index=True)
+            # count chunks disk loads
+            class Dedup(Drop_DuplicatesPd):
+                def init(test): 
+                    test.loads = 0
+                    test.operate(test.chunksdir, test.chunksdir + '.json', 
+                                 True)
+                def openchunk(test, chunkpath, mode='rb'):
+                    if mode == 'rb': test.loads += 1
+                    return Drop_DuplicatesPd.openchunk(test, chunkpath, mode)
+            Dedup.chunksdir = 'pickles'
+            nested = Dedup()
+            Dedup.chunksdir, Dedup.blocksize = 'blocks', 4
+            blocked = Dedup()
+            nchunks = len(blocked.chunkspaths)
+            self.assertLess(blocked.loads, nested.loads / 3)
+            self.assertLessEqual(blocked.loads, 
+                                 nchunks * (math.ceil(nchunks / 4) + 1))
+            for path in 'pickles.json', 'blocks.json':
+                self.assertTrue(unique.equals(pd.read_json(path, lines=True)))
+            # blocks bound by budget, evicted chunks written back
+            cache = ChunkCache(lambda data, path: None, budget=1)
+            for path in 'pickles.json', 'blocks.json': 
+                cache.put(path, unique.iloc[:10 ** 4])
+            self.assertEqual(list(cache.entries), ['blocks.json'])
+            self.PickleItUp()
+            Dedup.chunksdir, Dedup.budget = 'pickles', 0.5
+            budgeted = Dedup()
+            self.assertLess(budgeted.loads, nested.loads)
+            self.assertTrue(unique.equals(pd.read_json('pickles.json', 
+                                                       lines=True)))
+
+        # test cluster tasks on local workers processes
+        def test_cluster(self):
+            self.PickleItUp()
+            rows = ClusterRows()
+            rows.operate('pickles')
+            # a cluster without workers raises, random authkey
+            with Cluster(timeout=1) as idle:
+                self.assertEqual(idle.address[0], '127.0.0.1')
+                self.assertEqual(len(idle.authkey), 32)
+                self.assertRaises(RuntimeError, ClusterRows().operate, 
+                                  'pickles', workers=idle)
+            context = multiprocessing.get_context('fork')
+            with Cluster(('127.0.0.1', 0), b'test', timeout=1, 
+                         localitywait=60) as cluster:
+                workers = [context.Process(target=clusterworker, 
+                                           args=(cluster.address, b'test', 
+                                                 host), 
+                                           kwargs={'heartbeat': 0.2}, 
+                                           daemon=True) 
+                           for host in ('near', 'far')]
+                for worker in workers: worker.start()
+                while not {'near', 'far'} <= cluster.board.alive(): 
+                    time.sleep(0.1)
+                # chunks tasks wait for their host worker
+                ClusterRows.chunkhosts = {'pickles': 'near'}
+                local = ClusterRows()
+                local.operate('pickles', workers=cluster)
+                self.assertEqual(local.results, rows.results)
+                self.assertEqual({record['worker'] for record in 
+                                  local.metrics.records}, 
+                                 {'%s-%s' % (socket.gethostname(), 
+                                             workers[0].pid)})
+                # pairs tasks in rounds
+                Drop_DuplicatesPd().operate('pickles', 'test.out', 
+                                            workers=cluster)
+                unique = pd.read_json(self.origjson, lines=True)
+                unique = unique.drop_duplicates(ignore_index=True)
+                self.assertTrue(unique.equals(pd.read_json('test.out', 
+                                                           lines=True)))
+                # a dead worker task is retried by another worker
+                ClusterRows.chunkhosts = None
+                retried = ClusterRows()
+                retried.killed = 'killed'  # instance state, pickled
+                retried.operate('pickles', workers=cluster)
+                self.assertEqual(retried.results, 
+                                 [len(pd.read_pickle(path)) 
+                                  for path in retried.chunkspaths])
+                self.assertTrue(os.path.exists('killed'))
+                self.assertEqual([worker.is_alive() for worker in workers].count(
+                                 True), 1)
+            for worker in workers: worker.join(10)
+            self.assertFalse(any(worker.is_alive() for worker in workers))
+
+        # test copychunk kernel ways and buffer fallback
+        def test_copychunk(self):
+            data = os.urandom(3 * 10 ** 5)
+            with open('chunk', 'wb') as file: file.write(data)
+            class ShortWrites(io.FileIO):
+                def write(test, buffer): 
+                    return io.FileIO.write(test, buffer[:1000])
+            def refuse(*args): raise OSError('refused')
+            sendfiles = []
+            def sendfile(*args): 
+                sendfiles.append(args)
+                return kernelways['sendfile'](*args)
+            kernelways = {name: getattr(os, name) for name in 
+                          ('copy_file_range', 'sendfile') if hasattr(os, name)}
+            try:
+                # copy_file_range refused, sendfile copies
+                if 'copy_file_range' in kernelways: os.copy_file_range = refuse
+                if 'sendfile' in kernelways: os.sendfile = sendfile
+                with open('copy', 'wb', buffering=0) as ofile:
+                    self.assertEqual(copychunk('chunk', ofile), len(data))
+                self.assertEqual(bool(sendfiles), 'sendfile' in kernelways)
+                with open('copy', 'rb') as file: 
+                    self.assertEqual(file.read(), data)
+                # all refused, short buffer writes completed
+                for name in kernelways: setattr(os, name, refuse)
+                with ShortWrites('copy', 'w') as ofile:
+                    self.assertEqual(copychunk('chunk', ofile, 
+                                               buffersize=2 ** 12), len(data))
+            finally:
+                for name, way in kernelways.items(): setattr(os, name, way)
+            with open('copy', 'rb') as file: self.assertEqual(file.read(), data)
+            for path in 'chunk', 'copy': os.remove(path)
+
+        # test chunks codecs
+        def test_codecs(self):
+            self.PickleItUp()
+            self.assertTrue(os.path.exists(os.path.join('pickles', '.codec')))
+
+            # drop duplicates by recorded codec, join as json lines
+            Drop_DuplicatesPd.operate(Drop_DuplicatesPd(), 'pickles', 
+                                      'test.out', True)
+            unique = pd.read_json(self.origjson, lines=True)
+            unique = unique.drop_duplicates(ignore_index=True)
+            self.assertTrue(unique.equals(pd.read_json('test.out', 
+                                                       lines=True)))
+
+        # test chunks manifests and pairs pruning
+        def test_manifest(self):
+            # chunk sorted data, thus chunks ranges hardly overlap
+            sortedjson = 'sorted.json'
+            origdata   = pd.read_json(self.origjson, lines=True)
+            origdata.sort_values(list(origdata.columns), inplace=True)
+            origdata.to_json(sortedjson, lines=True, orient='records')
+            class ChunkPickles(BigData):
+                codec = 'pickle'
+                def init(test):
+                    pdIO = PandasIO()
+                    data, nchunks, nlines = pdIO.read_json(sortedjson, 
+                                                           lines=True,
+                                                           mb=True, 
+                                                           ranges=True,
+                                                           chunksize=self.mb)
+                    test.operate(data, test.chunksdir, nchunks, 
+                                 workers=test.workers)
+                def onchunkdata(test, data, chunkpath):
+                    test.dumpchunk(data, chunkpath)
+            ChunkPickles.chunksdir, ChunkPickles.workers = 'pickles', None
+            chunker = ChunkPickles()
+            manifest = chunker.manifest('pickles')
+            self.assertEqual(sorted(manifest), [os.path.basename(path) for 
+                                                path in chunker.chunkspaths])
+            self.assertEqual(sum(entry['rows'] for entry in manifest.values()),
+                             len(origdata))
+            # hashed as written
+            for path in chunker.chunkspaths:
+                self.assertEqual(chunker.chunkentry(path)['hash'], 
+                                 filehash(path))
+            # workers return their chunks entries, stats included
+            ChunkPickles.chunksdir, ChunkPickles.workers = 'workerpickles', 2
+            ChunkPickles()
+            with open(os.path.join('workerpickles', '.manifest')) as file:
+                workermanifest = jsonlib.load(file)
+            entries = lambda manifest: [
+                {key: value for key, value in manifest[name].items() 
+                 if key != 'mtime'} for name in sorted(manifest)]
+            self.assertEqual(entries(workermanifest), entries(manifest))
+
+            # stray files are not chunks, manifest lists chunks
+            open(os.path.join('pickles', 'stray'), 'w').close()
+            # drop duplicates, count operated pairs
+            class CountPairs(Drop_DuplicatesPd):
+                def init(test):
+                    test.pairs = 0
+                    test.operate('pickles', 'test.out', True)
+                def onparallelonce(test, selfpath, parallelpath):
+                    test.pairs += 1
+                    Drop_DuplicatesPd.onparallelonce(test, selfpath, 
+                                                     parallelpath)
+            counter = CountPairs()
+            nchunks = len(counter.chunkspaths)
+            self.assertEqual(nchunks, len(manifest))
+            self.assertLess(counter.pairs, nchunks * (nchunks + 1) / 2)
+            unique = origdata.drop_duplicates(ignore_index=True)
+            self.assertTrue(unique.equals(pd.read_json('test.out', 
+                                                       lines=True)))
+
+        # test resuming and incremental operations
+        def test_resume(self):
+            chunkspaths = self.PickleItUp().chunkspaths
+            # define in-place doubling, fails at fourth chunk
+            class Double(Chunks):
+                fail, resume, incremental = True, True, False
+                def init(test):
+                    test.operate('pickles', resume=test.resume, 
+                                 incremental=test.incremental)
+                def onchunkpath(test, chunkpath):
+                    if test.fail and chunkpath == chunkspaths[3]: 
+                        raise RuntimeError
+                    test.dumpchunk(test.loadchunk(chunkpath) * 2, chunkpath)
+                    return chunkpath
+            with self.assertRaises(RuntimeError): Double()
+            self.assertTrue(os.path.exists(os.path.join('pickles', 
+                                                        '.journal-Double')))
+            # resume failed operation
+            Double.fail = False
+            self.assertEqual(Double().results, chunkspaths[3:])
+            self.assertFalse(os.path.exists(os.path.join('pickles', 
+                                                         '.journal-Double')))
+            doubled  = pd.concat(map(pd.read_pickle, chunkspaths), 
+                                 ignore_index=True)
+            origdata = pd.read_json(self.origjson, lines=True)
+            self.assertTrue(doubled.equals(origdata * 2))
+
+            # incremental operations skip unchanged chunks
+            Double.resume, Double.incremental = False, True
+            self.assertEqual(Double().results, [])
+            pd.read_pickle(chunkspaths[1])[1:].to_pickle(chunkspaths[1])
+            self.assertEqual(Double().results, [chunkspaths[1]])
+
+            # pairs sweeps are journaled per self chunk
+            unique = pd.concat(map(pd.read_pickle, chunkspaths), 
+                               ignore_index=True)
+            unique = unique.drop_duplicates(ignore_index=True)
+            class Dedup(Drop_DuplicatesPd):
+                fail = True
+                def onparallelonce(test, selfpath, parallelpath):
+                    if test.fail and selfpath == chunkspaths[2]: 
+                        raise RuntimeError
+                    Drop_DuplicatesPd.onparallelonce(test, selfpath, 
+                                                     parallelpath)
+            with self.assertRaises(RuntimeError): 
+                Dedup().operate('pickles', resume=True)
+            with open(os.path.join('pickles', '.journal-Dedup')) as file:
+                self.assertEqual(file.read().split(), chunkspaths[:2])
+            Dedup.fail = False
+            Dedup().operate('pickles', resume=True)
+            self.assertTrue(unique.equals(pd.concat(map(pd.read_pickle, 
+                                                        chunkspaths), 
+                                                    ignore_index=True)))
+
+        # test metrics records
+        def test_metrics(self):
+            class KeepPickles(self.PickleItUp): keepmetrics = True
+            chunker = KeepPickles()
+            records = chunker.metrics.records
+            nchunks = len(chunker.chunkspaths)
+            self.assertEqual([record['task'] for record in records], 
+                             chunker.chunkspaths)
+            self.assertEqual(sum(record['rowsout'] for record in records), 
+                             len(self.origdata) * 5 / 4)
+            self.assertTrue(all(record['load'] > 0 and record['dump'] > 0 
+                                for record in records))
+
+            # workers records and hooks
+            class CountRows(Chunks):
+                keepmetrics = True
+                def init(test):
+                    test.hooked = []
+                    test.metrics.hooks.append(test.hooked.append)
+                    test.operate('pickles', workers=2)
+                def onchunkpath(test, chunkpath):
+                    return len(test.loadchunk(chunkpath))
+            counter = CountRows()
+            records = counter.metrics.records
+            self.assertEqual(counter.hooked, records)
+            self.assertEqual([record['rowsin'] for record in records], 
+                             counter.results)
+            self.assertTrue(all(record['peakrss'] for record in records))
+            # records passed to hooks only by default
+            class HookRows(CountRows): keepmetrics = False
+            hooker = HookRows()
+            self.assertEqual(hooker.metrics.records, [])
+            self.assertEqual(len(hooker.hooked), nchunks)
+
+            # export records
+            counter.metrics.tojson('metrics.json')
+            counter.metrics.tocsv('metrics.csv')
+            self.assertEqual(len(pd.read_json('metrics.json')), nchunks)
+            self.assertEqual(list(pd.read_csv('metrics.csv').columns), 
+                             Metrics.fields)
+
+        # test prefetching and writing behind
+        def test_prefetch(self):
+            # define pickle chunker
+            class ChunkPickles(BigData):
+                codec = 'pickle'
+                def init(test):
+                    pdIO = PandasIO()
+                    data, nchunks, nlines = pdIO.read_json(self.origjson, 
+                                                           lines=True,
+                                                           mb=True, 
+                                                           chunksize=self.mb)
+                    test.operate(data, 'pickles', nchunks, 'test.out', True,
+                                 prefetch=2, writebehind=2)
+                def onchunkdata(test, data, chunkpath):
+                    test.dumpchunk(data, chunkpath)
+            ChunkPickles(verbosity=True)
+            out = subprocess.run(['cmp', self.origjson, 'test.out'],
+                                 capture_output=True)
+            self.assertEqual(out.returncode, 0)
+
+            # reader errors raise in consumer
+            def failing():
+                yield 1
+                raise KeyError
+            with self.assertRaises(KeyError): list(prefetched(failing(), 1))
+            # consumer stops reader
+            reader = prefetched(itertools.count(), 1)
+            self.assertEqual(next(reader), 0)
+            reader.close()
+
+        # test workers processes
+        def test_workers(self):
+            # define chunker, counts rows
+            class ChunkAndCount(BigData):
+                def init(test):
+                    pdIO = PandasIO()
+                    data, nchunks, nlines = pdIO.read_json(self.origjson, 
+                                                           lines=True,
+                                                           mb=True, 
+                                                           chunksize=self.mb)
+                    test.operate(data, test.chunksdir, nchunks, 
+                                 test.chunksdir + '.out', True, test.workers)
+                def onchunkdata(test, data, chunkpath):
+                    data.to_json(chunkpath, lines=True, orient='records')
+                    return len(data)
+            # run (serial, workers) tests
+            ChunkAndCount.chunksdir, ChunkAndCount.workers = 'serial', None
+            serial  = ChunkAndCount(verbosity=True).results
+            ChunkAndCount.chunksdir, ChunkAndCount.workers = 'workers', 3
+            workers = ChunkAndCount(verbosity=True).results
+
+            # assert values in chunks order and joined bytes
+            self.assertEqual(serial, workers)
+            self.assertEqual(sum(workers), len(pd.read_json(self.origjson, 
+                                                            lines=True)))
+            out = subprocess.run(['cmp', 'serial.out', 'workers.out'],
+                                 capture_output=True)
+            self.assertEqual(out.returncode, 0)
+
+            # define stopping chunks operation
+            class StopAtThird(Chunks):
+                def init(test):
+                    test.operate(self.chunksdir, workers=2)
+                def onchunkpath(test, chunkpath):
+                    if chunkpath.endswith('-03'): raise test.StopOperation
+                    return chunkpath
+            self.ChunkItUp()
+            stopped = StopAtThird().results
+            self.assertEqual(stopped, ['test/test1/test1-01', 
+                                       'test/test1/test1-02'])
+            # stopping chunker removes chunks dumped past the stop
+            class ChunkToThird(BigData):
+                codec = 'pickle'
+                def init(test):
+                    test.operate([pd.DataFrame({'a': [num]}) 
+                                  for num in range(8)], 'stopped', workers=2)
+                def onchunkdata(test, data, chunkpath):
+                    if data['a'].iat[0] == 2: raise test.StopOperation
+                    test.dumpchunk(data, chunkpath)
+            ChunkToThird()
+            self.assertEqual(sorted(filename for filename 
+                                    in os.listdir('stopped') 
+                                    if not filename.startswith('.')), 
+                             ['stopped-1', 'stopped-2'])
+
+        # test PandasIO byte ranges
+        def test_byte_ranges(self):
+            # define ranges chunker
+            class ChunkRanges(BigData):
+                def init(test):
+                    pdIO = PandasIO(verbosity=True)
+                    data, nchunks, nlines = pdIO.read_json(self.origjson, 
+                                                           lines=True,
+                                                           mb=True, 
+                                                           ranges=True,
+                                                           chunksize=self.mb)
+                    self.assertIsNone(nlines)
+                    self.assertEqual(data.ranges[0][0], 0)
+                    self.assertEqual(data.ranges[-1][-1], 
+                                     os.path.getsize(self.origjson))
+                    test.operate(data, test.chunksdir, nchunks, 
+                                 test.chunksdir + '.out', True, test.workers)
+                def onchunkdata(test, data, chunkpath):
+                    data.to_json(chunkpath, lines=True, orient='records')
+            # run (serial, workers) tests
+            for chunksdir, workers in ('serial', None), ('workers', 2):
+                ChunkRanges.chunksdir, ChunkRanges.workers = chunksdir, workers
+                ChunkRanges(verbosity=2)
+                out = subprocess.run(['cmp', self.origjson, chunksdir + '.out'],
+                                     capture_output=True)
+                self.assertEqual(out.returncode, 0)
     unittest.main()
@@ -1,38 +1,187 @@
 
 import pandas as pd
-import subprocess, os
+import subprocess, os, mmap, struct, datetime, decimal
+
+# pymongo's bson (C extension), else decoded natively
+try:
+    import bson
+    from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
+    class ObjectIdDecoder(TypeDecoder):
+        bson_type = bson.ObjectId
+        def transform_bson(self, value): return str(value)
+    class Decimal128Decoder(TypeDecoder):
+        bson_type = bson.Decimal128
+        def transform_bson(self, value): return value.to_decimal()
+    bson_options = CodecOptions(type_registry=TypeRegistry(
+                                [ObjectIdDecoder(), Decimal128Decoder()]))
+except ImportError: bson = None
+
+int32  = struct.Struct('<i')
+int64  = struct.Struct('<q')
+double = struct.Struct('<d')
+epoch  = datetime.datetime(1970, 1, 1)
 
 def bson_to_json(bfile, jfile=None, type='json'):
-    "Exports bson file to json. jfile=bfile.type by default"
-    cmd = 'bsondump --bsonFile=%s --outFile=%s --type=%s'
-    cmd = cmd % (bfile, jfile, type,).split()
+    "Exports bson file to json by bsondump. jfile=bfile.type by default"
     if not jfile: jfile = os.path.splitext(bfile)[0] + '.' + type
-    subprocess.run()    # catch errors?
+    cmd = ['bsondump', '--bsonFile=%s' % bfile, '--outFile=%s' % jfile, 
+           '--type=%s' % type]
+    subprocess.run(cmd, check=True)
     return jfile
 
-def to_frame(docs, columns=None):
+def bson_ranges(bfile, rows=None, mb=None):
+    """
+    Returns (start, end) byte ranges of bfile documents batches of 
+    rows documents or about mb MB (a single range if neither), found 
+    by scanning documents length prefixes (no decoding).
+    """
+    ranges = []
+    limit  = int(mb * (10 ** 6)) if mb else None
+    with open(bfile, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size: return ranges
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            size, start, pos, ndocs = len(buffer), 0, 0, 0
+            while pos < size:
+                if pos + 5 > size: raise ValueError('truncated bson at %s' % pos)
+                length = int32.unpack_from(buffer, pos)[0]
+                if length < 5 or pos + length > size: 
+                    raise ValueError('corrupt bson document at %s' % pos)
+                pos   += length
+                ndocs += 1
+                if ((rows and ndocs >= rows) or 
+                    (limit and pos - start >= limit)):
+                    ranges.append((start, pos))
+                    start, ndocs = pos, 0
+            if start < size: ranges.append((start, size))
+    return ranges
+
+def bson_decode(buffer, start=0, end=None):
+    """
+    Returns documents (dicts) of buffer (ie. mmap) BSON documents in 
+    start:end. Decoded by pymongo's bson if installed, else natively. 
+    ObjectIds are hex strings, datetimes naive UTC and decimals 
+    Decimal in both. Natively, binaries are bytes, regexes, timestamps 
+    and codes (with scope) tuples and min, max keys None.
+    """
+    data = buffer[start:end]
+    if bson: return bson.decode_all(data, bson_options)
+    docs, pos, size = [], 0, len(data)
+    while pos < size:
+        doc, pos = decode_document(data, pos)
+        docs.append(doc)
+    return docs
+
+def decode_document(data, pos):
+    "Returns (document, end position) of data BSON document at pos"
+    end = pos + int32.unpack_from(data, pos)[0]
+    pos += 4
+    doc  = {}
+    while pos < end - 1:
+        btype = data[pos]
+        keyend = data.index(b'\x00', pos + 1)
+        key    = data[pos + 1:keyend].decode()
+        doc[key], pos = decode_value(data, btype, keyend + 1)
+    return doc, end
+
+def decode_string(data, pos):
+    length = int32.unpack_from(data, pos)[0]
+    return data[pos + 4:pos + 3 + length].decode(), pos + 4 + length
+
+def decode_cstring(data, pos):
+    end = data.index(b'\x00', pos)
+    return data[pos:end].decode(), end + 1
+
+def decode_decimal(data, pos):
+    "Returns IEEE 754-2008 decimal128 (BID) at pos as Decimal"
+    low, high = struct.unpack_from('<QQ', data, pos)
+    sign = high >> 63
+    if (high >> 58) & 0x1f == 0x1f: return decimal.Decimal('NaN')
+    if (high >> 58) & 0x1f == 0x1e: 
+        return decimal.Decimal('-Infinity' if sign else 'Infinity')
+    if (high >> 61) & 3 == 3: 
+        exponent, significand = (high >> 47) & 0x3fff, 0   # non canonical
+    else:
+        exponent    = (high >> 49) & 0x3fff
+        significand = ((high & 0x1ffffffffffff) << 64) | low
+        if significand > 10 ** 34 - 1: significand = 0
+    digits = tuple(map(int, str(significand)))
+    return decimal.Decimal((sign, digits, exponent - 6176))
+
+def decode_value(data, btype, pos):
+    "Returns (value, end position) of data BSON btype value at pos"
+    if   btype == 0x01: return double.unpack_from(data, pos)[0], pos + 8
+    elif btype in (0x02, 0x0d, 0x0e): return decode_string(data, pos)
+    elif btype == 0x03: return decode_document(data, pos)
+    elif btype == 0x04: 
+        doc, pos = decode_document(data, pos)
+        return list(doc.values()), pos
+    elif btype == 0x05:
+        length = int32.unpack_from(data, pos)[0]
+        return bytes(data[pos + 5:pos + 5 + length]), pos + 5 + length
+    elif btype in (0x06, 0x0a, 0xff, 0x7f): return None, pos
+    elif btype == 0x07: return data[pos:pos + 12].hex(), pos + 12
+    elif btype == 0x08: return data[pos] != 0, pos + 1
+    elif btype == 0x09:
+        millis = int64.unpack_from(data, pos)[0]
+        return epoch + datetime.timedelta(milliseconds=millis), pos + 8
+    elif btype == 0x0b:
+        pattern, pos = decode_cstring(data, pos)
+        flags,   pos = decode_cstring(data, pos)
+        return (pattern, flags), pos
+    elif btype == 0x0c:
+        namespace, pos = decode_string(data, pos)
+        return (namespace, data[pos:pos + 12].hex()), pos + 12
+    elif btype == 0x0f:
+        end = pos + int32.unpack_from(data, pos)[0]
+        code,  pos = decode_string(data, pos + 4)
+        scope, pos = decode_document(data, pos)
+        return (code, scope), end
+    elif btype == 0x10: return int32.unpack_from(data, pos)[0], pos + 4
+    elif btype == 0x11:
+        increment, time = struct.unpack_from('<II', data, pos)
+        return (time, increment), pos + 8
+    elif btype == 0x12: return int64.unpack_from(data, pos)[0], pos + 8
+    elif btype == 0x13: return decode_decimal(data, pos), pos + 16
+    raise ValueError('unknown bson type 0x%02x at %s' % (btype, pos))
+
+def to_frame(docs, columns=None, *, usecols=None, normalize=False):
     """
     Returns a frame with keys as columns for single docs or a frame 
-    with indices as columns for nested docs.
-    """
-    if not columns: docs = docs.dropna()            # single
-    def to_series(doc):
-        row = pd.Series(doc, dtype=object)
-        if row.empty:                               # nested
-            row = pd.Series([None] * len(columns), dtype=object)
-        return row
-    frame = docs.apply(to_series)
-    if columns: frame.columns = columns             # rename cols
-    return frame
+    with indices as columns for nested docs (ie. lists, named by 
+    columns, dicts keys are renamed to columns). The frame is built 
+    at once from docs (a series or an 
+    iterable, ie. a chunk column), usecols projects its columns (keys 
+    or columns names). If normalize, single docs sub-documents are 
+    flattened into 'key.subkey' columns (pd.json_normalize).
+    """
+    if not isinstance(docs, pd.Series): docs = pd.Series(list(docs), 
+                                                         dtype=object)
+    if not columns:                                 # single
+        docs = docs.dropna()
+        if normalize:
+            frame = pd.json_normalize(docs.tolist())
+            frame.index = docs.index
+            if usecols is not None: frame = frame.reindex(columns=usecols)
+            return frame
+        return pd.DataFrame(docs.tolist(), index=docs.index, 
+                            columns=usecols)
+    # nested or keyed (dicts), missing (ie. nan) docs are rows of nulls
+    keyed = any(isinstance(doc, dict) for doc in docs)
+    rows  = [doc if isinstance(doc, (list, tuple, dict)) else 
+             ({} if keyed else ()) for doc in docs]
+    frame = pd.DataFrame(rows, index=docs.index, dtype=object)
+    if not keyed: frame = frame.reindex(columns=range(len(columns)))
+    frame.columns = columns                         # rename cols
+    if usecols is not None: frame = frame[list(usecols)]
+    return frame.infer_objects()
 
 def to_values(docs, key, ignore_na=True):
     """
     Returns a series with keys as indices for single docs or a series 
-    with positional indices (ie. int) as indices for nested docs.
+    with positional indices (ie. int) as indices for nested docs. 
+    Values are got at once (Series.str.get), docs missing key are 
+    nulls. Missing docs are nulls if ignore_na, else raise TypeError.
     """
-    def to_value(doc):
-        return doc[key]
-    kwargs = dict()
-    if ignore_na: kwargs.update({'na_action': 'ignore'})
-    return docs.map(to_value, **kwargs)
-
+    if not ignore_na and docs.isna().any():
+        raise TypeError('missing docs, see ignore_na')
+    return docs.astype(object).str.get(key)
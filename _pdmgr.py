@@ -1,14 +1,284 @@
-
 # pandas specific interfaces
 
 import pandas as pd
+import numpy  as np
+import pickle, keyword, re
 
-def duplicated(df1, df2):
-    df  = pd.concat([df1, df2], keys=['df1', 'df2'])
-    dup = df.duplicated()
-    return dup.loc['df1'], dup.loc['df2']
+def duplicated(df1, df2, subset=None, keep='first', index=None):
+    """
+    Returns (dup1, dup2) boolean series of df1 and df2 rows duplicated 
+    as if df2 followed df1 (ie. pd.concat([df1, df2]).duplicated), 
+    on subset columns and by keep ('first', 'last' or False). df2 rows 
+    are probed in a HashIndex of df1 (built if index isn't passed), 
+    no frames are concatenated.
+    """
+    if index is None: index = HashIndex(df1, subset)
+    rows, positions = index.matches(df2)
+    dup1 = df1.duplicated(subset, keep=keep).to_numpy(copy=True)
+    dup2 = df2.duplicated(subset, keep=keep).to_numpy(copy=True)
+    if keep != 'last':  dup2[rows]      = True  # df1 rows come first
+    if keep != 'first': dup1[positions] = True  # df2 rows come last
+    return (pd.Series(dup1, index=df1.index), 
+            pd.Series(dup2, index=df2.index))
 
-def drop_duplicates(df1, df2):
-    dup1, dup2 = duplicated(df1, df2)
+def drop_duplicates(df1, df2, subset=None, keep='first', index=None):
+    "Returns df1 and df2 without duplicated rows, see duplicated"
+    dup1, dup2 = duplicated(df1, df2, subset, keep, index)
     df1,  df2  = df1[~dup1], df2[~dup2]
     return df1, df2
+
+class HashIndex:
+    """
+    Sorted rows hashes of a frame (on subset columns) probed by rows 
+    of other frames (see matches), built once and reused (ie. self 
+    chunk of pairs). Hashes matches are verified by rows values, thus 
+    hashes collisions are safe. Nulls are equal, as in pandas.
+    """
+    def __init__(self, df, subset=None):
+        self.df      = df
+        self.subset  = subset
+        hashes       = self.hashes(df)
+        self.order   = np.argsort(hashes, kind='stable')
+        self.sorted  = hashes[self.order]
+
+    def hashes(self, df): return hash_rows(df, self.subset)
+
+    def matches(self, df):
+        """
+        Returns (rows, positions) arrays of equal rows pairs, df rows 
+        positions and indexed frame rows positions.
+        """
+        hashes = self.hashes(df)
+        starts = np.searchsorted(self.sorted, hashes, 'left')
+        counts = np.searchsorted(self.sorted, hashes, 'right') - starts
+        rows   = np.repeat(np.arange(len(df)), counts)
+        # candidates positions in sorted hashes runs
+        offsets   = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - 
+                                                     counts, counts)
+        positions = self.order[np.repeat(starts, counts) + offsets]
+        equal     = self.equal(df, rows, positions)
+        return rows[equal], positions[equal]
+
+    def isin(self, df):
+        "Returns boolean array of df rows equal to an indexed frame row"
+        found = np.zeros(len(df), dtype=bool)
+        found[self.matches(df)[0]] = True
+        return found
+
+    def equal(self, df, rows, positions):
+        "Returns boolean array of df rows equal to indexed positions rows"
+        equal = np.ones(len(rows), dtype=bool)
+        if not len(rows): return equal
+        for column in keycolumns(self.df, self.subset):
+            values1 = df[column].to_numpy()[rows]
+            values2 = self.df[column].to_numpy()[positions]
+            nulls   = pd.isna(values1) & pd.isna(values2)
+            with np.errstate(invalid='ignore'):
+                equal &= (values1 == values2) | nulls
+        return equal
+
+def keycolumns(df, subset=None):
+    "Returns df columns labels considered for rows equality"
+    if subset is None: return list(df.columns)
+    if not pd.api.types.is_list_like(subset): return [subset]
+    return list(subset)
+
+def hash_rows(df, subset=None):
+    """
+    Returns uint64 hashes of df rows (on subset columns if passed). 
+    Numbers are hashed as float64 (ie. 1 and 1.0, 0.0 and -0.0 equal) 
+    and nulls as None, such that equal rows of chunks with different 
+    dtypes match.
+    """
+    hashes = np.zeros(len(df), dtype='uint64')
+    for column in keycolumns(df, subset):
+        series = df[column]
+        if series.dtype == bool: values = series.to_numpy()
+        elif pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy('float64', na_value=np.nan) + 0.0
+            values[np.isnan(values)] = np.nan   # single nan bits
+        else:
+            values = series.to_numpy(object)
+            if series.hasnans:
+                values = values.copy()
+                values[pd.isna(values)] = None
+        # mostly unique values, don't factorize (categorize)
+        hashes *= np.uint64(1000003)
+        hashes ^= pd.util.hash_array(values, categorize=False)
+    return hashes
+
+def hash_buckets(df, nbuckets, subset=None):
+    """
+    Yields (bucket, rows) pairs of df rows scattered into nbuckets
+    by row hashes. Equal rows (on subset) always share a bucket.
+    """
+    buckets = hash_rows(df, subset) % nbuckets
+    for bucket, rows in df.groupby(buckets, sort=True):
+        yield int(bucket), rows
+
+def stats(df):
+    """
+    Returns {column: {'nulls': n, 'min': x, 'max': y}} statistics of 
+    df, JSON ready. Only numeric (and bool) columns have min and max 
+    (None if all values are null).
+    """
+    stats = {}
+    for position, column in enumerate(df.columns):
+        series = df.iloc[:, position]
+        entry  = {'nulls': int(series.isna().sum())}
+        if pd.api.types.is_numeric_dtype(series):
+            for key, value in ('min', series.min()), ('max', series.max()):
+                if pd.isna(value): value = None
+                elif hasattr(value, 'item'): value = value.item()
+                entry[key] = value
+        stats[str(column)] = entry
+    return stats
+
+def dumpframe(frame, path):
+    "Appends a pickled frame to path, see loadframes"
+    with open(path, 'ab') as file:
+        pickle.dump(frame, file, pickle.HIGHEST_PROTOCOL)
+
+def loadframes(path):
+    "Yields frames appended to path by dumpframe in order"
+    with open(path, 'rb') as file:
+        while True:
+            try: yield pickle.load(file)
+            except EOFError: return
+
+# aggregations partials (per chunk), combined by associative combiners
+aggpartials = {'count': ['count'],
+               'sum':   ['sum'],
+               'min':   ['min'],
+               'max':   ['max'],
+               'mean':  ['count', 'sum'],
+               'var':   ['count', 'sum', 'sumsq'],
+               'std':   ['count', 'sum', 'sumsq'],}
+combiners   = {'count': 'sum', 'sum': 'sum', 'sumsq': 'sum', 
+               'min':   'min', 'max': 'max',}
+
+def aggspec(spec):
+    "Returns [(column, [funcs])] of {column: func or funcs} spec"
+    spec = [(column, [funcs] if isinstance(funcs, str) else list(funcs)) 
+            for column, funcs in spec.items()]
+    for column, funcs in spec:
+        for func in funcs:
+            if func not in aggpartials: 
+                raise ValueError('%r aggregation is not supported' % func)
+    return spec
+
+def partials(df, by, spec):
+    """
+    Returns df partial aggregates of spec ({column: func or funcs}, 
+    see aggpartials) grouped by keys (a single group if by is None). 
+    Columns are (column, partial) pairs, see combine and finalize.
+    """
+    keys  = [] if by is None else keycolumns(df, by)
+    frame = {'by%d' % num: df[key] for num, key in enumerate(keys)}
+    if not keys: frame['by0'] = np.zeros(len(df), dtype=np.int8)
+    aggs, labels = {}, {}
+    for num, (column, funcs) in enumerate(aggspec(spec)):
+        needed = list(dict.fromkeys(partial for func in funcs 
+                                            for partial in aggpartials[func]))
+        values = df[column]
+        if 'sumsq' in needed:
+            frame['sq%d' % num] = values.astype('float64') ** 2
+            aggs['sq%d'   % num], labels['sq%d' % num] = ['sum'], column
+            needed.remove('sumsq')
+        frame['v%d' % num] = values
+        aggs['v%d'   % num], labels['v%d' % num] = needed, column
+    frame  = pd.DataFrame(frame)
+    groups = [label for label in frame.columns if label.startswith('by')]
+    result = frame.groupby(groups, sort=False).agg(aggs)
+    result.columns = pd.MultiIndex.from_tuples(
+                        [(labels[label], 'sumsq' if label.startswith('sq') 
+                                                 else partial)
+                         for label, partial in result.columns])
+    result.index.names = keys or [None]
+    return result
+
+def combine(partials):
+    "Returns partials (list) combined per group, see partials"
+    partials = [partial for partial in partials if partial is not None]
+    if not partials: return None
+    combined = pd.concat(partials)
+    levels   = list(range(combined.index.nlevels))
+    return combined.groupby(level=levels, sort=True).agg(
+                    {column: combiners[column[1]] for column in combined})
+
+def finalize(combined, spec, ddof=1):
+    """
+    Returns spec aggregates frame of combined partials as pandas agg, 
+    ie. (column, func) columns if a column has funcs list. Mean and 
+    variance are derived from count, sum and sum of squares.
+    """
+    flat = all(isinstance(funcs, str) for funcs in spec.values())
+    if combined is None: return pd.DataFrame()
+    result = {}
+    for column, funcs in aggspec(spec):
+        for func in funcs:
+            partial = lambda name: combined[(column, name)]
+            if func in combiners: value = partial(func)
+            elif func == 'mean':  value = partial('sum') / partial('count')
+            else:
+                count = partial('count')
+                value = ((partial('sumsq') - partial('sum') ** 2 / count) / 
+                         (count - ddof)).clip(lower=0)
+                value = value.where(count > ddof)
+                if func == 'std': value = np.sqrt(value)
+            result[column if flat else (column, func)] = value
+    result = pd.DataFrame(result)
+    if result.index.names == [None]: result = result.reset_index(drop=True)
+    return result
+
+def downcast(df, categories=0.5):
+    """
+    Returns df with lossless smaller dtypes: integers to the smallest 
+    integers, floats to float32 if values are exact and strings 
+    (objects) to categoricals if unique values are categories 
+    fraction of rows at most (None to keep them).
+    """
+    columns = {}
+    for position, column in enumerate(df.columns):
+        series = df.iloc[:, position]
+        if pd.api.types.is_bool_dtype(series): pass
+        elif pd.api.types.is_integer_dtype(series) and series.dtype.kind in 'iu':
+            series = pd.to_numeric(series, downcast='integer')
+        elif series.dtype == 'float64':
+            small = series.astype('float32')
+            exact = (small.astype('float64') == series) | series.isna()
+            if exact.all(): series = small
+        elif (categories is not None and len(series) and 
+              (pd.api.types.is_object_dtype(series) or 
+               pd.api.types.is_string_dtype(series))):
+            try: unique = series.nunique(dropna=False)
+            except TypeError: unique = len(series) # unhashable (ie. dicts)
+            if unique <= categories * len(series): 
+                series = series.astype('category')
+        columns[position] = series
+    frame = pd.concat(columns, axis=1) if columns else df.copy()
+    frame.columns = df.columns
+    return frame
+
+def project(df, columns):
+    """
+    Returns df columns in columns (any collection) in df order, names 
+    of columns missing in df are ignored.
+    """
+    if columns is None: return df
+    return df[[column for column in df.columns if column in columns]]
+
+def exprcolumns(expr):
+    """
+    Returns names (set) an eval or query expression string may refer 
+    to as columns, ie. identifiers and `quoted` names, not keywords, 
+    functions calls, attributes, @locals or strings literals. Names 
+    may not be columns, see project.
+    """
+    names = set(re.findall(r'`([^`]*)`', expr))
+    expr  = re.sub(r'`[^`]*`|\'[^\']*\'|"[^"]*"', ' ', expr)
+    for match in re.finditer(r'(@|\.)?\b([A-Za-z_]\w*)\b(\s*\()?', expr):
+        prefix, name, call = match.groups()
+        if prefix or call or keyword.iskeyword(name): continue
+        names.add(name)
+    return names
@@ -0,0 +1,248 @@
+# mergeable sketches interfaces, vectorized over numpy columns
+
+import pandas as pd
+import numpy  as np
+
+def hashes(values):
+    """
+    Returns uint64 hashes of values (array like) but nulls. Numbers
+    are hashed as float64 (ie. 1 and 1.0 equal), as _pdmgr.hash_rows.
+    """
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    values = values.dropna()
+    if values.dtype == bool: values = values.to_numpy()
+    elif pd.api.types.is_numeric_dtype(values):
+        values = values.to_numpy('float64') + 0.0
+    else: values = values.to_numpy(object)
+    return pd.util.hash_array(values, categorize=False)
+
+def bitlength(values):
+    "Returns uint64 values bits lengths (0 of 0) exactly, no floats"
+    values  = values.copy()
+    lengths = np.zeros(len(values), dtype=np.uint8)
+    for shift in 32, 16, 8, 4, 2, 1:
+        high = values >= np.uint64(1 << shift)
+        lengths[high] += shift
+        values[high] >>= np.uint64(shift)
+    return lengths + (values > 0)
+
+class HyperLogLog:
+    """
+    Distinct values count sketch of 2 ** p registers (relative error
+    about 1.04 / sqrt(2 ** p)). Sketches of same p merge by registers
+    maximums, thus chunks sketches merge into a whole data sketch.
+    """
+    def __init__(self, p=14):
+        if not 4 <= p <= 18: raise ValueError('p %r not in [4, 18]' % p)
+        self.p         = p
+        self.registers = np.zeros(2 ** p, dtype=np.uint8)
+
+    def add(self, values):
+        "Adds values (array like, nulls ignored), returns self"
+        return self.addhashes(hashes(values))
+
+    def addhashes(self, hashed):
+        "Adds uint64 hashes of values, returns self"
+        if not len(hashed): return self
+        index = (hashed >> np.uint64(64 - self.p)).astype(np.intp)
+        rest  = hashed << np.uint64(self.p)
+        # rank: leading zeros of hashes rest bits, plus one
+        rank  = np.minimum(64 - bitlength(rest).astype(np.int16),
+                           64 - self.p) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+        return self
+
+    def merge(self, other):
+        "Merges other sketch in-place, returns self"
+        if other.p != self.p: raise ValueError("sketches p don't match")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        "Returns estimated distinct values count"
+        m        = len(self.registers)
+        alpha    = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(
+                                                                     int)))
+        zeros    = np.count_nonzero(self.registers == 0)
+        # small range correction, linear counting
+        if estimate <= 2.5 * m and zeros: estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+class KLL:
+    """
+    Quantiles sketch of numbers (KLL), compactors levels of at most
+    about k items, an item of level h weighs 2 ** h values. A full
+    level is sorted and every other item (random offset) is promoted
+    to the next level. Ranks error is about 1.7 / k, sketches of same
+    k merge by levels.
+    """
+    c = 2 / 3   # capacities decay per level below the top
+
+    def __init__(self, k=200, seed=0):
+        self.k      = k
+        self.n      = 0
+        self.min    = np.nan
+        self.max    = np.nan
+        self.levels = [np.empty(0)]
+        self.rng    = np.random.default_rng(seed)
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * self.c ** depth)), 2)
+
+    def add(self, values):
+        "Adds numbers (array like, nulls ignored), returns self"
+        values = pd.Series(values).to_numpy('float64', na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if not len(values): return self
+        self.n  += len(values)
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        return self.compress()
+
+    def compress(self):
+        "Compacts levels over capacity, returns self"
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items  = np.sort(items)
+                odd    = len(items) % 2  # an item stays, pairs compact
+                offset = self.rng.integers(2)
+                self.levels[level + 1] = np.concatenate(
+                             [self.levels[level + 1], items[odd + offset::2]])
+                self.levels[level]     = items[:odd]
+            level += 1
+        return self
+
+    def merge(self, other):
+        "Merges other sketch in-place, returns self"
+        if other.k != self.k: raise ValueError("sketches k don't match")
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n  += other.n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self.compress()
+
+    def weighted(self):
+        "Returns (items, cumulative weights) sorted by items"
+        items   = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(values), 2 ** level)
+                                  for level, values in enumerate(self.levels)])
+        order   = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        "Returns estimated q quantile (or quantiles array), nan if empty"
+        q = np.asarray(q, dtype=float)
+        if not self.n: return np.full(q.shape, np.nan)[()]
+        items, weights = self.weighted()
+        positions = np.searchsorted(weights, q * weights[-1], 'left')
+        values    = items[np.minimum(positions, len(items) - 1)]
+        values    = np.where(q <= 0, self.min, values)
+        return np.where(q >= 1, self.max, values)[()]
+
+    def rank(self, value):
+        "Returns estimated fraction of values less or equal to value"
+        if not self.n: return np.nan
+        items, weights = self.weighted()
+        position = np.searchsorted(items, value, 'right')
+        return weights[position - 1] / weights[-1] if position else 0.0
+
+class CountMin:
+    """
+    Values frequencies sketch of depth rows of width counters, counts
+    are overestimated by about 2 / width of values count at most
+    (probability 1 - 0.5 ** depth). topk values with highest estimates
+    are kept as heavy hitters candidates. Sketches of same width, depth
+    and seed merge by counters sums.
+    """
+    def __init__(self, width=2048, depth=5, topk=32, seed=0):
+        self.width      = width
+        self.depth      = depth
+        self.topk       = topk
+        self.seed       = seed
+        self.n          = 0
+        self.table      = np.zeros((depth, width), dtype=np.int64)
+        self.candidates = {}    # value: hash
+        self.factors    = np.random.default_rng(seed).integers(
+                            1, 2 ** 63, depth, dtype=np.uint64) | np.uint64(1)
+
+    def indices(self, hashed):
+        "Returns (depth, len(hashed)) counters columns of hashes"
+        mixed = hashed[None, :] * self.factors[:, None]   # wraps mod 2 ** 64
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.intp)
+
+    def add(self, values):
+        "Adds values (array like, nulls ignored), returns self"
+        values = pd.Series(values) if not isinstance(values, pd.Series) else values
+        values = values.dropna()
+        if not len(values): return self
+        codes, uniques = pd.factorize(values)
+        counts = np.bincount(codes)
+        hashed = hashes(uniques)
+        for row, columns in enumerate(self.indices(hashed)):
+            self.table[row] += np.bincount(columns, weights=counts,
+                                           minlength=self.width).astype(np.int64)
+        self.n += len(values)
+        top     = np.argsort(-counts, kind='stable')[:self.topk]
+        uniques = uniques.take(top).tolist()     # python scalars
+        for value, hashvalue in zip(uniques, hashed[top]):
+            self.candidates[value] = hashvalue
+        return self.prune()
+
+    def prune(self):
+        "Keeps topk candidates of highest estimates, returns self"
+        if len(self.candidates) <= self.topk: return self
+        values    = list(self.candidates)
+        estimates = self.estimatehashes(np.array(list(self.candidates.values()),
+                                                 dtype=np.uint64))
+        keep      = np.argsort(-estimates, kind='stable')[:self.topk]
+        self.candidates = {values[position]: self.candidates[values[position]]
+                           for position in keep}
+        return self
+
+    def merge(self, other):
+        "Merges other sketch in-place, returns self"
+        if ((other.width, other.depth, other.seed) !=
+            (self.width,  self.depth,  self.seed)):
+            raise ValueError("sketches width, depth or seed don't match")
+        self.table += other.table
+        self.n     += other.n
+        self.candidates.update(other.candidates)
+        return self.prune()
+
+    def estimatehashes(self, hashed):
+        rows = np.arange(self.depth)[:, None]
+        return self.table[rows, self.indices(hashed)].min(axis=0)
+
+    def estimate(self, values):
+        "Returns estimated counts array of values (not nulls)"
+        return self.estimatehashes(hashes(values))
+
+    def heavyhitters(self, fraction=None):
+        """
+        Returns {value: estimated count} of candidates by descending
+        counts, with fraction of values count at least if passed.
+        """
+        if not self.candidates: return {}
+        values    = list(self.candidates)
+        estimates = self.estimatehashes(np.array(list(self.candidates.values()),
+                                                 dtype=np.uint64))
+        hitters   = {values[position]: int(estimates[position])
+                     for position in np.argsort(-estimates, kind='stable')}
+        if fraction is None: return hitters
+        return {value: count for value, count in hitters.items()
+                if count >= fraction * self.n}
+
+# sketches kinds, register custom (add, merge) sketches here
+sketches = {'distinct':  HyperLogLog,
+            'quantiles': KLL,
+            'frequent':  CountMin,}
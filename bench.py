@@ -0,0 +1,299 @@
+"""
+Benchmark suite of the package system and pandas interfaces on
+synthetic data. Results (seconds, throughput and peak memory) are
+written as JSON and compared against a baseline results file.
+    - usage:
+        + python -m datamgr.bench --rows 10000 100000 -o results.json
+        + python -m datamgr.bench -o new.json --baseline results.json
+
+Exit status is 1 if a benchmark regressed past the tolerance, only
+results of same settings (scale, data, chunks and workers) compare.
+Peak memory is measured by tracemalloc in a separate traced run, thus
+it counts Python allocations of this process only: it isn't measured
+with workers processes (see --workers).
+"""
+
+import pandas as pd
+import numpy  as np
+import os, sys, time, shutil, tempfile, platform, tracemalloc
+import json as jsonlib
+import argparse
+
+from . import (BigData, Chunks, Drop_DuplicatesPd, PandasIO, peakrss,
+               _pdmgr as pdmgr)
+
+
+#################################################################
+# synthetic data
+#################################################################
+dtypemixes = {'float': ['float'],
+              'int':   ['int'],
+              'str':   ['str'],
+              'mixed': ['float', 'int', 'str', 'bool'],}
+
+def synthetic(nrows, width=10, dtypes='mixed', dupratio=0.25, seed=0):
+    """
+    Returns a shuffled frame of nrows rows and width columns, where
+    dupratio of the rows duplicate other rows. Columns cycle dtypes
+    mix kinds (see dtypemixes).
+    """
+    rng     = np.random.default_rng(seed)
+    nunique = max(nrows - int(nrows * dupratio), 1)
+    kinds   = dtypemixes[dtypes]
+    columns = {}
+    for column in range(width):
+        kind = kinds[column % len(kinds)]
+        if   kind == 'float': values = rng.standard_normal(nunique)
+        elif kind == 'int':   values = rng.integers(0, 2 ** 31, nunique)
+        elif kind == 'str':
+            values = rng.integers(0, 2 ** 31, nunique).astype(str)
+            values = np.char.add('k', values)  # not parsed as numbers
+        else:                 values = rng.integers(0, 2, nunique) == 1
+        columns['c%s' % column] = values
+    unique = pd.DataFrame(columns)
+    dups   = unique.take(rng.integers(0, nunique, nrows - nunique))
+    data   = pd.concat([unique, dups], ignore_index=True)
+    return data.take(rng.permutation(len(data))).reset_index(drop=True)
+
+
+#################################################################
+# benchmarks
+#################################################################
+class ChunkIt(BigData):
+    "chunks a json lines file by PandasIO.read_json(mb=True)"
+    operation = 'chunking ...'
+    def __init__(self, ipath, chunksdir, mb, codec, workers=None, **kwargs):
+        self.ipath, self.chunksdir, self.mb = ipath, chunksdir, mb
+        self.codec, self.workers = codec, workers
+        BigData.__init__(self, **kwargs)
+    def init(self):
+        pdIO = PandasIO()
+        data, nchunks, nlines = pdIO.read_json(self.ipath, lines=True,
+                                               mb=True, chunksize=self.mb)
+        self.operate(data, self.chunksdir, nchunks, workers=self.workers)
+    def onchunkdata(self, data, chunkpath): self.dumpchunk(data, chunkpath)
+
+class LoadChunks(Chunks):
+    "loads every chunk of chunksdir, results are chunks rows"
+    operation = 'loading ...'
+    def __init__(self, chunksdir, workers=None, **kwargs):
+        self.chunksdir, self.workers = chunksdir, workers
+        Chunks.__init__(self, **kwargs)
+    def init(self): self.operate(self.chunksdir, workers=self.workers)
+    def onchunkpath(self, chunkpath): return len(self.loadchunk(chunkpath))
+
+class DropDuplicates(Drop_DuplicatesPd):
+    "drops chunksdir duplicates in-place"
+    def __init__(self, chunksdir, workers=None, **kwargs):
+        self.chunksdir, self.workers = chunksdir, workers
+        Drop_DuplicatesPd.__init__(self, **kwargs)
+    def init(self): self.operate(self.chunksdir, workers=self.workers)
+
+class Case:
+    "a benchmark case (scale) data and working directory"
+    def __init__(self, workdir, nrows, width, dtypes, dupratio, mb, codec,
+                       workers=None):
+        self.key = {'scale': nrows, 'width': width, 'dtypes': dtypes,
+                    'dupratio': dupratio, 'mb': mb, 'codec': codec,
+                    'workers': workers}
+        self.data      = synthetic(nrows, width, dtypes, dupratio)
+        self.nrows     = nrows
+        self.mb        = mb
+        self.codec     = codec
+        self.workers   = workers
+        self.ipath     = os.path.join(workdir, 'data.json')
+        self.chunksdir = os.path.join(workdir, 'chunks')
+        self.opath     = os.path.join(workdir, 'data.out')
+        self.data.to_json(self.ipath, lines=True, orient='records')
+
+    def chunksbytes(self):
+        return sum(os.path.getsize(path) for path in
+                   Chunks().findchunks(self.chunksdir))
+
+def bench_chunking(case):
+    "PandasIO.read_json(mb=True) chunking and dumpchunk"
+    if os.path.exists(case.chunksdir): shutil.rmtree(case.chunksdir)
+    ChunkIt(case.ipath, case.chunksdir, case.mb, case.codec, case.workers)
+    return case.nrows, os.path.getsize(case.ipath)
+
+def bench_chunks(case):
+    "Chunks.operate loading every chunk"
+    rows = sum(LoadChunks(case.chunksdir, case.workers).results)
+    return rows, case.chunksbytes()
+
+def bench_joinchunks(case):
+    "joinchunks of chunks into a single file"
+    chunks = Chunks()
+    chunks.joinchunks(chunks.findchunks(case.chunksdir), case.opath,
+                      case.workers)
+    return case.nrows, os.path.getsize(case.opath)
+
+def bench_drop_duplicates(case):
+    "Drop_DuplicatesPd in-place on chunks (pairs)"
+    nbytes = case.chunksbytes()
+    DropDuplicates(case.chunksdir, case.workers)
+    return case.nrows, nbytes
+
+def bench_duplicated(case):
+    "pdmgr.duplicated of data halves in memory"
+    half = case.nrows // 2
+    pdmgr.duplicated(case.data.iloc[:half], case.data.iloc[half:])
+    return case.nrows, int(case.data.memory_usage(deep=True).sum())
+
+# in running order, drop_duplicates changes chunks in-place
+benchmarks = {'chunking':        bench_chunking,
+              'chunks':          bench_chunks,
+              'joinchunks':      bench_joinchunks,
+              'drop_duplicates': bench_drop_duplicates,
+              'duplicated':      bench_duplicated,}
+
+
+#################################################################
+# measuring and comparing
+#################################################################
+def measure(bench, case, trace=False):
+    """
+    Returns bench(case) result {seconds, rows, bytes, rowspersec,
+    mbpersec, peakmb (tracemalloc, None if not trace)}. Tracing slows
+    allocations, seconds of a traced run aren't comparable.
+    """
+    if trace: tracemalloc.start()
+    try:
+        clock       = time.perf_counter()
+        rows, nbytes = bench(case)
+        seconds     = time.perf_counter() - clock
+        peak        = tracemalloc.get_traced_memory()[1] if trace else None
+    finally:
+        if trace: tracemalloc.stop()
+    secs = max(seconds, 1e-9)
+    return {'seconds':    seconds,
+            'rows':       rows,
+            'bytes':      nbytes,
+            'rowspersec': rows / secs,
+            'mbpersec':   nbytes / (10 ** 6) / secs,
+            'peakmb':     peak and peak / (10 ** 6),}
+
+def run(scales, names, width=10, dtypes='mixed', dupratio=0.25, mb=0.5,
+        codec='pickle', workers=None, repeat=1, trace=True, verbose=False):
+    """
+    Returns results (list of dicts) of names benchmarks at scales
+    (rows counts). Benchmarks run repeat untraced times per scale, the
+    median seconds run is kept. If trace, peak memory is measured by a
+    last traced run of benchmarks, unless workers (not traced).
+    """
+    trace   = trace and not workers
+    results = []
+    for nrows in scales:
+        workdir = tempfile.mkdtemp(prefix='datamgr-bench-')
+        try:
+            case = Case(workdir, nrows, width, dtypes, dupratio, mb, codec,
+                        workers)
+            runs  = {name: [] for name in names}
+            peaks = {}
+            # whole passes, benchmarks change chunks in-place in order
+            for traced in [False] * repeat + [True] * trace:
+                for name, bench in benchmarks.items():
+                    # chunks are (re)made for benchmarks on chunks
+                    if name not in names and name != 'chunking': continue
+                    result = measure(bench, case, traced)
+                    if name not in names: continue
+                    if traced: 
+                        peaks[name] = result['peakmb']
+                        continue
+                    if verbose:
+                        print('=> %-16s: %s rows, %.4f secs, %.2f MB/s' % (
+                              name, nrows, result['seconds'],
+                              result['mbpersec']))
+                    runs[name].append(result)
+            for name in names:
+                ordered = sorted(runs[name], key=lambda result: 
+                                                 result['seconds'])
+                median  = dict(ordered[(len(ordered) - 1) // 2], 
+                               peakmb=peaks.get(name))
+                results.append(dict(benchmark=name, **case.key, 
+                                    repeat=repeat, **median))
+        finally: shutil.rmtree(workdir)
+    return results
+
+def environment():
+    "Returns the running environment description"
+    return {'python':   platform.python_version(),
+            'pandas':   pd.__version__,
+            'numpy':    np.__version__,
+            'platform': platform.platform(),
+            'cpus':     os.cpu_count(),
+            'peakrss':  peakrss(),}
+
+# results of same key (benchmark and settings) compare
+keyfields = ['benchmark', 'scale', 'width', 'dtypes', 'dupratio', 'mb',
+             'codec', 'workers', 'repeat']
+
+def resultkey(result):
+    return tuple(result.get(field) for field in keyfields)
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Returns regressions (list of messages) of results against baseline
+    results, ie. seconds or peak memory greater by tolerance fraction.
+    Benchmarks missing in baseline (same settings) are not compared.
+    """
+    baseline    = {resultkey(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = baseline.get(resultkey(result))
+        if not base: continue
+        for field in 'seconds', 'peakmb':
+            new, old = result.get(field), base.get(field)
+            if new is None or not old: continue
+            if new > old * (1 + tolerance):
+                regressions.append('%s (%s rows): %s %.4f > %.4f (+%d%%)' % (
+                                   result['benchmark'], result['scale'], field,
+                                   new, old, (new / old - 1) * 100))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m datamgr.bench',
+                                     description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10 ** 4, 10 ** 5],
+                        help='rows counts (scales)')
+    parser.add_argument('--width', type=int, default=10, help='columns count')
+    parser.add_argument('--dtypes', choices=dtypemixes, default='mixed',
+                        help='columns dtypes mix')
+    parser.add_argument('--dupratio', type=float, default=0.25,
+                        help='duplicated rows fraction')
+    parser.add_argument('--mb', type=float, default=0.5, help='chunksize in MB')
+    parser.add_argument('--codec', default='pickle', help='chunks codec')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='workers processes (peak memory not traced)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='timed runs per benchmark, median kept')
+    parser.add_argument('--benchmarks', nargs='+', choices=benchmarks,
+                        default=list(benchmarks), help='benchmarks to run')
+    parser.add_argument('--notrace', action='store_true',
+                        help="no traced run for peak memory (tracemalloc)")
+    parser.add_argument('-o', '--output', help='results JSON file path')
+    parser.add_argument('--baseline', help='baseline results JSON file path')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='regression tolerance fraction')
+    parser.add_argument('-q', '--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, args.benchmarks, args.width, args.dtypes,
+                  args.dupratio, args.mb, args.codec, args.workers,
+                  args.repeat, not args.notrace, not args.quiet)
+    report  = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file: jsonlib.dump(report, file, indent=1)
+    else: print(jsonlib.dumps(report, indent=1))
+    if not args.baseline: return 0
+    with open(args.baseline) as file: baseline = jsonlib.load(file)['results']
+    regressions = compare(results, baseline, args.tolerance)
+    keys        = {resultkey(result) for result in baseline}
+    for result in results:
+        if resultkey(result) not in keys:
+            print('not compared (no baseline of same settings):',
+                  result['benchmark'], result['scale'], file=sys.stderr)
+    for regression in regressions: print('regressed:', regression)
+    return 1 if regressions else 0
+
+if __name__ == '__main__': sys.exit(main())